@@ -0,0 +1,81 @@
+"""Sub-Saharan Africa maps and Draw.io migration diagrams.
+
+Public functions are re-exported lazily: ``from africa_maps import write_drawio``
+only imports the Draw.io module, and geopandas/matplotlib are loaded the
+first time something is actually read or rendered.
+"""
+import importlib
+
+_EXPORTS = {
+    'load_countries': 'data',
+    'load_world': 'data',
+    'download_countries': 'data',
+    'choose_resolution': 'data',
+    'select_region': 'regions',
+    'REGIONS': 'regions',
+    'Region': 'regions',
+    'classify_highlights': 'regions',
+    'assign_colors': 'regions',
+    'build_alias_index': 'regions',
+    'country_keys': 'regions',
+    'resolve_countries': 'regions',
+    'render_base_map': 'render',
+    'render_highlight_map': 'render',
+    'render_academic_map': 'render',
+    'HighlightTemplate': 'render',
+    'HighlightJob': 'batch',
+    'render_highlight_batch': 'batch',
+    'image_transform': 'render',
+    'write_tile_pyramid': 'tiles',
+    'build_maps': 'build',
+    'OutputCache': 'build',
+    'instrumented': 'instrument',
+    'add_sink': 'instrument',
+    'remove_sink': 'instrument',
+    'LoggingSink': 'instrument',
+    'JsonLinesSink': 'instrument',
+    'PrometheusSink': 'instrument',
+    'AFRICA_ALBERS': 'projection',
+    'project_layer': 'projection',
+    'load_admin1': 'admin1',
+    'Admin1Layer': 'admin1',
+    'render_admin1_map': 'admin1',
+    'Territory': 'territories',
+    'DERIVED_TERRITORIES': 'territories',
+    'split_territories': 'territories',
+    'animate_flows': 'animate',
+    'load_indicators': 'choropleth',
+    'IndicatorTable': 'choropleth',
+    'ChoroplethMap': 'choropleth',
+    'render_choropleth': 'choropleth',
+    'render_regions': 'region_maps',
+    'enable_headless': 'headless',
+    'new_figure': 'headless',
+    'close_figure': 'headless',
+    'render_to_bytes': 'headless',
+    'RenderWorker': 'headless',
+    'read_flows': 'flows',
+    'aggregate_flows': 'flows',
+    'threshold_flows': 'flows',
+    'bundle_flows': 'flows',
+    'draw_flows': 'flows',
+    'render_flow_map': 'flows',
+    'write_flows_drawio': 'flows',
+    'write_drawio': 'drawio',
+    'country_anchors': 'drawio',
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f'.{module}', __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,180 @@
+"""Sub-national (admin-1) units: provinces, counties, regions.
+
+The Natural Earth admin-1 layer is loaded through the same GeoParquet cache
+as the countries, keeping only the identifying columns. ``Admin1Layer``
+indexes it once - row positions per country code and an STRtree over the
+geometry - so selecting the units of a few countries or of a bounding box
+never scans the whole layer, and caches every selection::
+
+    admin1 = Admin1Layer(load_admin1())
+    render_admin1_map(load_countries(), admin1, countries=['KEN'],
+                      highlight=['Nairobi', 'Mombasa'], output_path='kenya_counties.png')
+
+All units of a map are drawn as a single collection.
+"""
+import os
+
+from .data import CACHE_DIR, DATA_DIR, load_cached_layer
+from .instrument import layer_counts, stage
+
+# Natural Earth has admin-1 units for every country only at 10m
+ADMIN1_RESOLUTION = '10m'
+
+# Columns kept from the admin-1 shapefile
+ADMIN1_COLUMNS = ('adm1_code', 'iso_3166_2', 'adm0_a3', 'admin', 'name', 'name_en', 'type_en')
+
+# Columns whose values identify a unit, in order of precedence
+_UNIT_ALIAS_COLUMNS = ('adm1_code', 'iso_3166_2', 'name', 'name_en')
+
+_CACHE_PREFIX = 'admin1-'
+
+HIGHLIGHT_COLOR = '#8856a7'
+
+
+def admin1_path(resolution=ADMIN1_RESOLUTION, data_dir=DATA_DIR):
+    """Path of the Natural Earth admin-1 shapefile at ``resolution``."""
+    return os.path.join(data_dir, f'ne_{resolution}_admin_1_states_provinces.shp')
+
+
+def _keep_columns(units):
+    units = units.rename(columns=str.lower)
+    columns = [column for column in ADMIN1_COLUMNS if column in units.columns]
+    return units[columns + ['geometry']].reset_index(drop=True)
+
+
+def load_admin1(shapefile_path=None, cache_dir=CACHE_DIR):
+    """Load the admin-1 units of the world, using the GeoParquet cache when possible."""
+    return load_cached_layer(shapefile_path or admin1_path(), _CACHE_PREFIX, _keep_columns, cache_dir)
+
+
+class Admin1Layer:
+    """Admin-1 units with per-country and spatial indexes and cached selections."""
+
+    def __init__(self, units):
+        from .geometry import spatial_index
+
+        self.units = units
+        self.tree = spatial_index(units)
+
+        # Row positions per country code, and country codes/names -> code
+        self._by_country = units.groupby(units['adm0_a3'].astype(str)).indices
+        self._country_aliases = {code.casefold(): code for code in self._by_country}
+        if 'admin' in units.columns:
+            for name, code in zip(units['admin'].astype(str), units['adm0_a3'].astype(str)):
+                self._country_aliases.setdefault(name.casefold(), code)
+
+        self._selections = {}
+
+    def country_codes(self, countries):
+        """``adm0_a3`` codes for ISO codes or country names; unknown entries are dropped."""
+        return sorted({self._country_aliases[name] for name in (str(c).casefold() for c in countries)
+                       if name in self._country_aliases})
+
+    def select(self, countries=None, bbox=None):
+        """Units in ``countries`` and/or intersecting ``bbox`` (min lon, min lat, max lon, max lat).
+
+        With neither, all units are returned. Results are cached per
+        selection and must not be modified in place.
+        """
+        import numpy as np
+        import shapely
+
+        codes = None if countries is None else tuple(self.country_codes(countries))
+        key = (codes, None if bbox is None else tuple(bbox))
+        if key in self._selections:
+            return self._selections[key]
+
+        with stage('select_admin1') as st:
+            positions = None
+            if codes is not None:
+                parts = [self._by_country[code] for code in codes if code in self._by_country]
+                positions = np.sort(np.concatenate(parts)) if parts else np.empty(0, dtype=int)
+            if bbox is not None:
+                hits = self.tree.query(shapely.box(*bbox), predicate='intersects')
+                positions = np.sort(hits) if positions is None else np.intersect1d(positions, hits)
+            selection = self.units if positions is None else self.units.iloc[positions]
+            if st:
+                st.set(**layer_counts(selection))
+
+        self._selections[key] = selection
+        return selection
+
+    def unit_mask(self, units, names):
+        """Boolean Series marking the rows of ``units`` matching any of ``names``.
+
+        Names are matched case-insensitively against unit codes and names.
+        """
+        import pandas as pd
+
+        wanted = pd.Index([str(name) for name in names]).str.casefold()
+        mask = pd.Series(False, index=units.index)
+        for column in _UNIT_ALIAS_COLUMNS:
+            if column in units.columns:
+                mask |= units[column].astype(str).str.casefold().isin(wanted)
+        return mask
+
+
+def _selection_extent(units, margin=0.05):
+    min_x, min_y, max_x, max_y = units.total_bounds
+    pad_x, pad_y = (max_x - min_x) * margin, (max_y - min_y) * margin
+    return min_x - pad_x, max_x + pad_x, min_y - pad_y, max_y + pad_y
+
+
+def draw_admin1(ax, units, facecolors, edgecolor='#999999', linewidth=0.2, zorder=1.5):
+    """Add ``units`` to ``ax`` as one PathCollection and return it."""
+    from matplotlib.collections import PathCollection
+
+    from .render import geometry_paths
+
+    paths, colors = [], []
+    for geometry, color in zip(units.geometry, facecolors):
+        if geometry is None:
+            continue
+        for path in geometry_paths(geometry):
+            paths.append(path)
+            colors.append(color)
+    collection = PathCollection(paths, facecolor=colors, edgecolor=edgecolor, linewidth=linewidth,
+                                zorder=zorder)
+    ax.add_collection(collection)
+    return collection
+
+
+def render_admin1_map(africa, admin1, countries=None, bbox=None, highlight=(), colors=None,
+                      output_path=None, dpi=600, figsize=(10, 12), extent=None, crs=None):
+    """Render the countries map with the admin-1 units of a selection on top.
+
+    The units of ``countries`` and/or ``bbox`` (see ``Admin1Layer.select``)
+    are drawn with the units named in ``highlight`` filled, in ``colors``
+    (keyed by unit name or code) or ``HIGHLIGHT_COLOR``. ``extent`` defaults
+    to the selection's bounds. Returns the figure.
+    """
+    from .labels import label_anchors
+    from .projection import prepare_view
+    from .render import FOCUS_COLORS, HighlightTemplate, save_figure
+
+    units = admin1.select(countries, bbox)
+    if extent is None:
+        extent = _selection_extent(units)
+
+    template = HighlightTemplate(africa, figsize=figsize, extent=extent, dpi=dpi, crs=crs)
+    fig = template.render((), {})
+
+    with stage('plot', map='admin1') as st:
+        visible, _ = prepare_view(units, extent, dpi, figsize, crs)
+        highlighted = admin1.unit_mask(visible, [*highlight, *(colors or {})])
+        facecolors = highlighted.map({True: HIGHLIGHT_COLOR, False: FOCUS_COLORS['other']})
+        for name, color in (colors or {}).items():
+            facecolors[admin1.unit_mask(visible, [name])] = color
+        draw_admin1(template.ax, visible, facecolors)
+
+        # Names of the highlighted units
+        chosen = visible[highlighted]
+        for x, y, name in zip(*label_anchors(chosen), chosen['name']):
+            template.ax.text(x, y, name, fontsize=6, ha='center', va='center', color='#333333',
+                             fontweight='bold', zorder=3)
+        if st:
+            st.set(**layer_counts(visible))
+
+    if output_path:
+        save_figure(fig, output_path, dpi=dpi, bbox_inches='tight')
+    return fig
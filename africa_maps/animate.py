@@ -0,0 +1,303 @@
+"""Animated migration flow maps.
+
+A time-indexed flow table - ``(period, origin, destination, volume)`` rows,
+as a DataFrame or any iterable - becomes one frame per period, written as
+MP4, GIF or APNG depending on the output's extension::
+
+    animate_flows(load_countries(), monthly_flows, 'migration_flows.mp4', processes=8)
+
+Each process draws the basemap once and keeps its pixels. A frame restores
+those pixels and draws only its own artists on top (blitting): the
+highlighted countries taking part in the period's flows, the flow arrows
+and the period label. Frames are rendered and compressed in a process pool
+and stitched together in order; MP4 encoding is handed to ffmpeg.
+"""
+import io
+import math
+import os
+import shutil
+import struct
+import subprocess
+import zlib
+from collections import deque
+from fractions import Fraction
+
+from .drawio import DEFAULT_FLOW_COLOR, flow_widths
+from .instrument import output_size, stage
+from .regions import SUBSAHARAN_EXTENT
+from .render import FOCUS_COLORS
+
+# Output format by file extension
+FORMATS = {'.mp4': 'mp4', '.gif': 'gif', '.png': 'apng', '.apng': 'apng'}
+
+# Frames sent to a worker at a time
+_FRAMES_PER_TASK = 4
+
+_PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+
+# Frame renderer of the current worker process
+_worker_renderer = None
+
+
+def _timed_flow_rows(flows):
+    """(period, origin, destination, volume) tuples from a DataFrame or an iterable."""
+    if hasattr(flows, 'itertuples'):
+        return flows.iloc[:, :4].itertuples(index=False, name=None)
+    return iter(flows)
+
+
+def flow_frames(flows, periods=None, label=str, min_width=1.0, max_width=8.0):
+    """Frames of a time-indexed flow table as ``(title, [(origin, destination, width), ...])``.
+
+    Stroke widths are scaled over the whole table, so they compare across
+    frames. ``periods`` fixes the frame sequence (e.g. to keep months
+    without flows); by default it is every period in the table, sorted.
+    ``label`` turns a period into the frame's title.
+    """
+    rows = [(period, o, d, float(v)) for period, o, d, v in _timed_flow_rows(flows)]
+    widths = flow_widths([v for *_, v in rows], min_width, max_width)
+    by_period = {}
+    for (period, o, d, _), width in zip(rows, widths):
+        by_period.setdefault(period, []).append((o, d, width))
+    if periods is None:
+        periods = sorted(by_period)
+    return [(label(period), by_period.get(period, [])) for period in periods]
+
+
+class FrameRenderer:
+    """Highlight map whose background is rendered once and blitted into every frame."""
+
+    def __init__(self, countries, colors=FOCUS_COLORS, figsize=(10, 12), extent=SUBSAHARAN_EXTENT, dpi=100,
+                 crs=None):
+        import matplotlib
+
+        from .render import HighlightTemplate
+
+        self.colors = colors
+        self.template = HighlightTemplate(countries, figsize=figsize, extent=extent, dpi=dpi, crs=crs)
+        self.template.color_countries({}, colors.get('other', FOCUS_COLORS['other']))
+        fig = self.template.fig
+        fig.set_dpi(dpi)
+
+        canvas = fig.canvas
+        canvas.draw()
+        self._background = canvas.copy_from_bbox(fig.bbox)
+
+        # Crop every frame like savefig(bbox_inches='tight'), to even sizes
+        # as video encoders require
+        bbox = fig.get_tightbbox(canvas.get_renderer()).padded(matplotlib.rcParams['savefig.pad_inches'])
+        width, height = int(fig.bbox.width), int(fig.bbox.height)
+        left, right = max(0, math.floor(bbox.x0 * dpi)), min(width, math.ceil(bbox.x1 * dpi))
+        top, bottom = max(0, height - math.ceil(bbox.y1 * dpi)), min(height, height - math.floor(bbox.y0 * dpi))
+        self.crop = (top, bottom - (bottom - top) % 2, left, right - (right - left) % 2)
+
+    def render(self, title, flows):
+        """RGB pixels of the frame showing ``flows`` (``(origin, destination, width)``)."""
+        import numpy as np
+        from matplotlib.patches import FancyArrowPatch
+
+        template = self.template
+        ax = template.ax
+        canvas = template.fig.canvas
+        canvas.restore_region(self._background)
+
+        names = list(dict.fromkeys(name for o, d, _ in flows for name in (o, d)))
+        points = template.anchor_points(names)
+        artists = template.overlay(names, self.colors, default_color=DEFAULT_FLOW_COLOR, animated=True)
+        for origin, destination, width in flows:
+            if origin not in points or destination not in points:
+                continue
+            artists.append(ax.add_patch(FancyArrowPatch(
+                points[origin], points[destination],
+                connectionstyle='arc3,rad=0.2',  # Curved like the Draw.io edges
+                arrowstyle='-|>',
+                mutation_scale=6 + 2 * width,
+                linewidth=width,
+                color=self.colors.get(origin, DEFAULT_FLOW_COLOR),
+                alpha=0.85,
+                zorder=2.5,  # Between the highlighted countries and their labels
+                animated=True
+            )))
+        artists.append(ax.text(0.02, 0.02, title, transform=ax.transAxes, fontsize=14, fontweight='bold',
+                               color='#333333', ha='left', va='bottom', zorder=5, animated=True))
+
+        for artist in artists:
+            ax.draw_artist(artist)
+        top, bottom, left, right = self.crop
+        pixels = np.asarray(canvas.buffer_rgba())[top:bottom, left:right, :3].copy()
+        for artist in artists:
+            artist.remove()
+        return pixels
+
+    def close(self):
+        self.template.close()
+
+
+def _encode(pixels, kind):
+    """A frame as the format's writer wants it: raw pixels, a paletted image or PNG bytes."""
+    from PIL import Image
+
+    if kind == 'mp4':
+        return pixels
+    image = Image.fromarray(pixels)
+    if kind == 'gif':
+        return image.quantize(256, method=Image.Quantize.FASTOCTREE)
+    buffer = io.BytesIO()
+    image.save(buffer, format='png')
+    return buffer.getvalue()
+
+
+def _init_worker(*renderer_args):
+    global _worker_renderer
+
+    from .headless import enable_headless
+
+    enable_headless()
+    _worker_renderer = FrameRenderer(*renderer_args)
+
+
+def _render_in_worker(kind, frames):
+    return [_encode(_worker_renderer.render(*frame), kind) for frame in frames]
+
+
+def _encoded_frames(frames, kind, processes, renderer_args):
+    """Encoded frames in order, rendered in this process or in a pool of ``processes``."""
+    if processes <= 1 or len(frames) <= _FRAMES_PER_TASK:
+        renderer = FrameRenderer(*renderer_args)
+        try:
+            for frame in frames:
+                yield _encode(renderer.render(*frame), kind)
+        finally:
+            renderer.close()
+        return
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    tasks = [frames[i:i + _FRAMES_PER_TASK] for i in range(0, len(frames), _FRAMES_PER_TASK)]
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=renderer_args) as executor:
+        # Keep only a few tasks ahead of the writer, so finished frames
+        # don't pile up in memory
+        pending = deque()
+        for task in tasks:
+            pending.append(executor.submit(_render_in_worker, kind, task))
+            if len(pending) >= 2 * processes:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _ffmpeg_path():
+    import matplotlib
+
+    ffmpeg = shutil.which(matplotlib.rcParams['animation.ffmpeg_path'])
+    if ffmpeg is None:
+        raise RuntimeError("MP4 output needs ffmpeg; install it or set rcParams['animation.ffmpeg_path']")
+    return ffmpeg
+
+
+def _write_mp4(frames, output_path, fps):
+    process = None
+    try:
+        for pixels in frames:
+            if process is None:
+                height, width = pixels.shape[:2]
+                process = subprocess.Popen(
+                    [_ffmpeg_path(), '-y', '-loglevel', 'error',
+                     '-f', 'rawvideo', '-pix_fmt', 'rgb24', '-s', f'{width}x{height}', '-r', str(fps), '-i', '-',
+                     '-c:v', 'libx264', '-pix_fmt', 'yuv420p', '-f', 'mp4', output_path],
+                    stdin=subprocess.PIPE)
+            process.stdin.write(pixels.tobytes())
+    except BaseException:
+        if process is not None:
+            process.kill()
+            process.wait()
+        raise
+    process.stdin.close()
+    if process.wait() != 0:
+        raise RuntimeError(f"ffmpeg failed with exit status {process.returncode}")
+
+
+def _write_gif(frames, f, fps):
+    frames = iter(frames)
+    first = next(frames)
+    first.save(f, format='gif', save_all=True, append_images=frames, duration=round(1000 / fps), loop=0)
+
+
+def _png_chunks(data):
+    position = len(_PNG_SIGNATURE)
+    while position < len(data):
+        length, kind = struct.unpack('>I4s', data[position:position + 8])
+        yield kind, data[position + 8:position + 8 + length]
+        position += 12 + length
+
+
+def _write_chunk(f, kind, data):
+    f.write(struct.pack('>I', len(data)) + kind + data + struct.pack('>I', zlib.crc32(kind + data)))
+
+
+def _write_apng(frames, f, count, fps):
+    """Stitch ``count`` PNG-encoded frames into an APNG without compressing them again."""
+    delay = Fraction(1 / fps).limit_denominator(1000)
+    sequence = 0
+    for n, data in enumerate(frames):
+        chunks = list(_png_chunks(data))
+        if n == 0:
+            header = dict(chunks)[b'IHDR']
+            width, height = struct.unpack('>II', header[:8])
+            f.write(_PNG_SIGNATURE)
+            _write_chunk(f, b'IHDR', header)
+            _write_chunk(f, b'acTL', struct.pack('>II', count, 0))
+        _write_chunk(f, b'fcTL', struct.pack('>5I2H2B', sequence, width, height, 0, 0,
+                                             delay.numerator, delay.denominator, 0, 0))
+        sequence += 1
+        for kind, body in chunks:
+            if kind != b'IDAT':
+                continue
+            # The first frame doubles as the default image
+            if n == 0:
+                _write_chunk(f, b'IDAT', body)
+            else:
+                _write_chunk(f, b'fdAT', struct.pack('>I', sequence) + body)
+                sequence += 1
+    _write_chunk(f, b'IEND', b'')
+
+
+def animate_flows(countries, flows, output_path='migration_flows.mp4', periods=None, label=str,
+                  colors=FOCUS_COLORS, fps=12, dpi=100, figsize=(10, 12), extent=SUBSAHARAN_EXTENT, crs=None,
+                  processes=None, min_width=1.0, max_width=8.0):
+    """Animate a time-indexed flow table with one frame per period.
+
+    The format follows the extension of ``output_path``: ``.mp4`` (needs
+    ffmpeg), ``.gif``, or ``.png``/``.apng`` for an animated PNG. See
+    ``flow_frames`` for ``periods``, ``label`` and the stroke widths; arrows
+    take their color from ``colors`` by origin. Frames render in
+    ``processes`` worker processes (default: one per CPU; 1 renders here).
+    Returns ``output_path``.
+    """
+    kind = FORMATS.get(os.path.splitext(output_path)[1].lower())
+    if kind is None:
+        raise ValueError(f"Unsupported animation format {output_path!r}, expected one of {sorted(FORMATS)}")
+    if kind == 'mp4':
+        _ffmpeg_path()
+    frames = flow_frames(flows, periods, label, min_width, max_width)
+    if not frames:
+        raise ValueError("The flow table has no periods to animate")
+    if processes is None:
+        processes = os.cpu_count() or 1
+
+    encoded = _encoded_frames(frames, kind, processes, (countries, colors, figsize, extent, dpi, crs))
+    tmp_path = output_path + '.tmp'
+    with stage('animate', frames=len(frames), format=kind, processes=processes) as st:
+        if kind == 'mp4':
+            _write_mp4(encoded, tmp_path, fps)
+        else:
+            with open(tmp_path, 'wb') as f:
+                if kind == 'gif':
+                    _write_gif(encoded, f, fps)
+                else:
+                    _write_apng(encoded, f, len(frames), fps)
+        os.replace(tmp_path, output_path)
+        if st:
+            st.set(output_bytes=output_size(output_path))
+    return output_path
@@ -0,0 +1,66 @@
+"""Batch rendering of many highlight-map variants over one loaded basemap.
+
+Each worker builds a single ``HighlightTemplate`` and renders all of its jobs
+on it, so the background countries are drawn once per figure rather than
+once per variant::
+
+    jobs = [HighlightJob(['KEN', 'SOM'], palette, 'east.png'), ...]
+    render_highlight_batch(load_countries(), jobs, processes=4)
+"""
+from collections import namedtuple
+
+from .headless import enable_headless
+from .render import FOCUS_COLORS, HighlightTemplate
+
+# One variant: focus ISO codes, palette (ISO -> color plus 'other'), output path
+HighlightJob = namedtuple('HighlightJob', ['focus', 'palette', 'output_path', 'dpi'])
+HighlightJob.__new__.__defaults__ = (FOCUS_COLORS, None, 600)
+
+# Template of the current worker process
+_worker_template = None
+
+
+def _render_jobs(template, jobs):
+    return [template.render(job.focus, job.palette, job.output_path, job.dpi) for job in jobs]
+
+
+def _init_worker(africa, figsize, dpi):
+    global _worker_template
+
+    # Workers never display anything
+    enable_headless()
+
+    _worker_template = HighlightTemplate(africa, figsize=figsize, dpi=dpi)
+
+
+def _render_in_worker(job):
+    return _worker_template.render(job.focus, job.palette, job.output_path, job.dpi)
+
+
+def render_highlight_batch(africa, jobs, processes=None, figsize=(10, 12)):
+    """Render every ``HighlightJob`` in ``jobs`` and return the output paths.
+
+    With ``processes`` set to more than one, jobs are spread over a process
+    pool; each worker receives ``africa`` once and keeps its own template.
+    """
+    jobs = [HighlightJob(*job) if not isinstance(job, HighlightJob) else job for job in jobs]
+    for job in jobs:
+        if not job.output_path:
+            raise ValueError(f"Highlight job for {list(job.focus)} has no output path")
+
+    # Geometry is simplified for the sharpest output in the batch
+    dpi = max((job.dpi for job in jobs), default=600)
+
+    if not processes or processes <= 1 or len(jobs) <= 1:
+        template = HighlightTemplate(africa, figsize=figsize, dpi=dpi)
+        try:
+            return _render_jobs(template, jobs)
+        finally:
+            template.close()
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    chunksize = max(1, len(jobs) // (processes * 4))
+    with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                             initargs=(africa, figsize, dpi)) as executor:
+        return list(executor.map(_render_in_worker, jobs, chunksize=chunksize))
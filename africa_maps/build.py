@@ -0,0 +1,263 @@
+"""Incremental builds of the map artifacts.
+
+Each artifact is keyed by a hash of everything that affects it: the
+shapefile's content hash, the focus/highlight sets, palette, extent, dpi
+and figure size (plus ``BUILD_VERSION`` for changes to the drawing code).
+Built files go into a content-addressed ``OutputCache``; when an
+artifact's key is already in the cache the file is restored from there
+instead of being rendered, and nothing is loaded or drawn at all when
+every artifact is up to date::
+
+    build_maps()  # {'base': False, 'highlight': False, 'drawio': True, 'academic': False}
+"""
+import hashlib
+import json
+import os
+import shutil
+
+from .data import (CACHE_DIR, DEFAULT_RESOLUTION, choose_resolution, download_countries, load_countries,
+                   shapefile_fingerprint, shapefile_path_for)
+from .drawio import MIGRATION_FLOWS
+from .fetch import sha256_file
+from .regions import FOCUS_COUNTRIES, HIGHLIGHTED_COUNTRY_VARIANTS, HIGHLIGHTED_ISO_CODES, SUBSAHARAN_EXTENT
+from .render import FOCUS_COLORS
+from .territories import territories_key
+
+BUILD_CACHE_DIR = os.path.join(CACHE_DIR, 'outputs')
+MAX_CACHE_BYTES = 1 << 30
+
+# Bump when the rendering changes in a way the hashed inputs don't capture
+BUILD_VERSION = 5
+
+# Artifacts built by build_maps, in dependency order
+ARTIFACTS = ('base', 'highlight', 'drawio', 'academic')
+
+OUTPUT_NAMES = {
+    'base': 'subsaharan_africa_base.png',
+    'highlight': 'subsaharan_africa_highlighted.png',
+    'drawio': 'migration_flows.drawio',
+    'academic': 'subsaharan_africa_academic_map.png',
+}
+
+
+def input_key(kind, inputs):
+    """Hash of an artifact kind and its JSON-serializable inputs."""
+    payload = json.dumps({'kind': kind, 'version': BUILD_VERSION, 'inputs': inputs},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _atomic_copy(src, dst):
+    tmp_path = dst + '.tmp'
+    shutil.copyfile(src, tmp_path)
+    os.replace(tmp_path, dst)
+
+
+class OutputCache:
+    """Content-addressed store of built artifacts with size-based LRU eviction.
+
+    Files are stored once per content hash under ``objects/``, and
+    ``keys/`` maps each input key to a content hash plus metadata. Objects
+    are touched on every hit; once the store grows beyond ``max_bytes`` the
+    least recently used ones are evicted.
+    """
+
+    def __init__(self, cache_dir=BUILD_CACHE_DIR, max_bytes=MAX_CACHE_BYTES):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+
+    def _object_path(self, sha256):
+        return os.path.join(self.cache_dir, 'objects', sha256[:2], sha256)
+
+    def _key_path(self, key):
+        return os.path.join(self.cache_dir, 'keys', f'{key}.json')
+
+    def lookup(self, key):
+        """Cache entry ``{'sha256': ..., 'meta': ...}`` for ``key``, or None."""
+        try:
+            with open(self._key_path(key)) as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        path = self._object_path(entry['sha256'])
+        if not os.path.exists(path):
+            return None
+        os.utime(path)
+        return entry
+
+    def restore(self, entry, output_path):
+        """Copy the entry's file to ``output_path`` unless it is already there."""
+        if os.path.exists(output_path) and sha256_file(output_path) == entry['sha256']:
+            return
+        _atomic_copy(self._object_path(entry['sha256']), output_path)
+
+    def store(self, key, output_path, meta=None):
+        """Add the file at ``output_path`` under ``key`` and return its entry."""
+        sha256 = sha256_file(output_path)
+        path = self._object_path(sha256)
+        if os.path.exists(path):
+            os.utime(path)
+        else:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            _atomic_copy(output_path, path)
+
+        entry = {'sha256': sha256, 'meta': meta}
+        key_path = self._key_path(key)
+        os.makedirs(os.path.dirname(key_path), exist_ok=True)
+        with open(key_path + '.tmp', 'w') as f:
+            json.dump(entry, f)
+        os.replace(key_path + '.tmp', key_path)
+
+        self.evict()
+        return entry
+
+    def evict(self):
+        """Remove least recently used objects until the store fits ``max_bytes``.
+
+        The most recent object is always kept. Keys that point to an evicted
+        object are simply misses from then on.
+        """
+        objects = []
+        for root, _, names in os.walk(os.path.join(self.cache_dir, 'objects')):
+            for name in names:
+                path = os.path.join(root, name)
+                stat = os.stat(path)
+                objects.append((stat.st_mtime_ns, stat.st_size, path))
+        objects.sort()
+
+        total = sum(size for _, size, _ in objects)
+        for _, size, path in objects[:-1]:
+            if total <= self.max_bytes:
+                break
+            os.remove(path)
+            total -= size
+
+
+def build_artifact(cache, kind, inputs, output_path, render):
+    """Restore ``output_path`` from ``cache`` or build it with ``render``.
+
+    ``render(output_path)`` writes the file and may return JSON-serializable
+    metadata to keep alongside it. Returns ``(rebuilt, meta)``.
+    """
+    key = input_key(kind, inputs)
+    entry = cache.lookup(key)
+    if entry is not None:
+        cache.restore(entry, output_path)
+        return False, entry['meta']
+    meta = render(output_path)
+    cache.store(key, output_path, meta)
+    return True, meta
+
+
+def build_maps(output_dir='.', shapefile_path=None, resolution=DEFAULT_RESOLUTION,
+               focus_countries=FOCUS_COUNTRIES, colors=FOCUS_COLORS, flows=MIGRATION_FLOWS,
+               artifacts=ARTIFACTS, cache=None):
+    """Build the requested ``artifacts`` in ``output_dir``, rendering only what changed.
+
+    ``artifacts`` are names from ``ARTIFACTS``. With ``resolution='auto'``
+    each artifact gets the dataset ``choose_resolution`` picks for its own
+    dpi and figure size; an explicit ``shapefile_path`` is used for all of
+    them. Returns a dict of artifact name -> whether it was rebuilt.
+    """
+    from .drawio import _flow_rows
+
+    unknown = [name for name in artifacts if name not in ARTIFACTS]
+    if unknown:
+        raise ValueError(f"Unknown artifacts {unknown}; expected some of {ARTIFACTS}")
+
+    cache = cache or OutputCache()
+    datasets = {}
+    loaded = {}
+
+    def dataset_for(dpi, figsize):
+        """Shapefile path and dataset key of an artifact drawn at ``dpi``/``figsize``."""
+        path = shapefile_path
+        if path is None:
+            path = shapefile_path_for(choose_resolution(SUBSAHARAN_EXTENT, dpi, figsize)
+                                      if resolution == 'auto' else resolution)
+        if path not in datasets:
+            download_countries(path)
+            datasets[path] = {'name': os.path.basename(path), 'sha256': shapefile_fingerprint(path),
+                              'territories': territories_key()}
+        return path, datasets[path]
+
+    def countries(path):
+        # Only loaded once something actually has to be drawn
+        if path not in loaded:
+            loaded[path] = load_countries(path)
+        return loaded[path]
+
+    paths = {name: os.path.join(output_dir, OUTPUT_NAMES[name]) for name in ARTIFACTS}
+    rebuilt = {}
+
+    if 'base' in artifacts:
+        base_path, base_dataset = dataset_for(300, (10, 12))
+
+        def render_base(output_path):
+            from .headless import close_figure
+            from .render import render_base_map
+
+            close_figure(render_base_map(countries(base_path), output_path, dpi=300))
+
+        inputs = {'dataset': base_dataset, 'extent': SUBSAHARAN_EXTENT, 'dpi': 300, 'figsize': (10, 12)}
+        rebuilt['base'], _ = build_artifact(cache, 'base', inputs, paths['base'], render_base)
+
+    if 'highlight' in artifacts or 'drawio' in artifacts:
+        highlight_path, highlight_dataset = dataset_for(600, (10, 12))
+        highlight_inputs = {
+            'dataset': highlight_dataset,
+            'focus': sorted(str(name) for name in focus_countries),
+            'colors': colors,
+            'extent': SUBSAHARAN_EXTENT,
+            'dpi': 600,
+            'figsize': (10, 12),
+        }
+
+        def render_highlight(output_path):
+            from .headless import close_figure
+            from .render import image_transform, render_highlight_map
+
+            fig = render_highlight_map(countries(highlight_path), focus_countries, colors, output_path, dpi=600)
+            transform = image_transform(fig, dpi=600)
+            close_figure(fig)
+            return transform._asdict()
+
+        rebuilt['highlight'], transform = build_artifact(cache, 'highlight', highlight_inputs,
+                                                         paths['highlight'], render_highlight)
+
+    if 'drawio' in artifacts:
+        from .render import GeoTransform
+
+        rows = [(o, d, float(v)) for o, d, v in _flow_rows(flows)]
+
+        def render_drawio(output_path):
+            from .drawio import country_anchors, write_drawio
+
+            names = [name for flow in rows for name in flow[:2]]
+            anchors = country_anchors(countries(highlight_path), GeoTransform(**transform), names)
+            write_drawio(rows, anchors, (transform['width'], transform['height']), output_path,
+                         image=OUTPUT_NAMES['highlight'], colors=colors)
+
+        inputs = {'highlight': input_key('highlight', highlight_inputs), 'flows': rows, 'colors': colors}
+        rebuilt['drawio'], _ = build_artifact(cache, 'drawio', inputs, paths['drawio'], render_drawio)
+
+    if 'academic' in artifacts:
+        academic_path, academic_dataset = dataset_for(300, (14, 16))
+
+        def render_academic(output_path):
+            from .headless import close_figure
+            from .render import render_academic_map
+
+            close_figure(render_academic_map(countries(academic_path), output_path=output_path, dpi=300))
+
+        inputs = {
+            'dataset': academic_dataset,
+            'highlight': (HIGHLIGHTED_COUNTRY_VARIANTS, HIGHLIGHTED_ISO_CODES),
+            'extent': SUBSAHARAN_EXTENT,
+            'dpi': 300,
+            'figsize': (14, 16),
+        }
+        rebuilt['academic'], _ = build_artifact(cache, 'academic', inputs, paths['academic'],
+                                                render_academic)
+
+    return {name: rebuilt[name] for name in artifacts}
@@ -0,0 +1,276 @@
+"""Choropleth maps from indicator tables.
+
+An indicator table (CSV or Parquet, one row per country, one column per
+indicator) is read once and joined to the countries layer once: every row
+identifier - ISO code or any country name the alias index knows - is
+resolved to a country key in one vectorized lookup, and the table row of
+each country is kept as a position array. Pulling out an indicator is then
+a single NumPy take, so many indicators come from one loaded table::
+
+    table = IndicatorTable(load_indicators('migrant_stock.parquet'), africa)
+    choropleth = ChoroplethMap(africa)
+    for indicator in table.indicators:
+        choropleth.render(table.values(indicator), f'{indicator}.png', scheme='jenks', title=indicator)
+
+Class breaks (quantiles or Jenks natural breaks) are computed in NumPy.
+The map is drawn once; each render only recolors it and swaps the legend.
+"""
+import os
+
+from .instrument import stage
+from .regions import SUBSAHARAN_EXTENT
+from .render import FOCUS_COLORS, save_figure
+
+SCHEMES = ('quantile', 'jenks')
+
+# Jenks is quadratic in the number of values; larger inputs are subsampled
+JENKS_MAX_VALUES = 2000
+
+MISSING_COLOR = FOCUS_COLORS['other']
+
+
+def load_indicators(path, index_column='ISO_A3', columns=None, filters=None):
+    """Read an indicator table from CSV or Parquet, indexed by ``index_column``.
+
+    ``columns`` limits the indicators read. ``filters`` is a dict of
+    ``column: value`` selecting rows (e.g. ``{'year': 2020}``); for Parquet
+    it is pushed down to the reader. When a country has several rows the
+    first one is kept.
+    """
+    import pandas as pd
+
+    usecols = None
+    if columns is not None:
+        usecols = list(dict.fromkeys([index_column, *columns, *(filters or {})]))
+
+    with stage('load', source='indicators') as st:
+        if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+            table = pd.read_parquet(path, columns=usecols,
+                                    filters=[(column, '==', value) for column, value in filters.items()]
+                                    if filters else None)
+        else:
+            table = pd.read_csv(path, usecols=usecols, dtype={index_column: str})
+        for column, value in (filters or {}).items():
+            table = table[table[column] == value]
+        table = table.drop(columns=list(filters or {})).set_index(index_column)
+        table = table[~table.index.duplicated(keep='first')]
+        if st:
+            st.set(rows=len(table), indicators=len(table.columns))
+    return table
+
+
+class IndicatorTable:
+    """Indicator columns joined once to the countries of a layer.
+
+    ``table`` is indexed by ISO code or country name; rows that match no
+    country in ``countries`` are ignored.
+    """
+
+    def __init__(self, table, countries):
+        import numpy as np
+        import pandas as pd
+
+        from .regions import build_alias_index, country_keys
+
+        self.table = table
+        with stage('join', rows=len(table), features=len(countries)) as st:
+            self.keys = pd.Index(country_keys(countries).unique())
+            alias_index = build_alias_index(countries)
+            row_keys = alias_index.reindex(table.index.astype(str).str.casefold()).to_numpy()
+
+            # Table row position of each country, -1 where it has none
+            rows = pd.Series(np.arange(len(table)), index=row_keys)
+            rows = rows[rows.index.notna() & ~rows.index.duplicated(keep='first')]
+            self._positions = rows.reindex(self.keys, fill_value=-1).to_numpy()
+            if st:
+                st.set(matched=int((self._positions >= 0).sum()))
+
+    @property
+    def indicators(self):
+        """Numeric indicator columns."""
+        return [column for column in self.table.columns if self.table[column].dtype.kind in 'biuf']
+
+    def values(self, indicator):
+        """Float Series of ``indicator`` indexed by country key, NaN where missing."""
+        import numpy as np
+        import pandas as pd
+
+        column = self.table[indicator].to_numpy(dtype=float)
+        found = self._positions >= 0
+        values = np.full(len(self.keys), np.nan)
+        values[found] = column[self._positions[found]]
+        return pd.Series(values, index=self.keys, name=indicator)
+
+
+def _finite(values):
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    return values[np.isfinite(values)]
+
+
+def quantile_breaks(values, k=5):
+    """Class bounds ``[min, ..., max]`` putting about as many values in each of ``k`` classes.
+
+    Bounds that coincide because of ties are merged, so fewer classes may
+    result.
+    """
+    import numpy as np
+
+    values = _finite(values)
+    if not len(values):
+        return np.array([])
+    breaks = np.unique(np.quantile(values, np.linspace(0, 1, k + 1)))
+    return breaks if len(breaks) > 1 else np.repeat(breaks, 2)
+
+
+def jenks_breaks(values, k=5, max_values=JENKS_MAX_VALUES):
+    """Jenks natural breaks: class bounds ``[min, ..., max]`` minimizing the within-class variance.
+
+    Fisher's exact dynamic program over the sorted values, vectorized over
+    the start of the last class. More than ``max_values`` values are
+    subsampled evenly in sorted order.
+    """
+    import numpy as np
+
+    values = np.sort(_finite(values))
+    if not len(values):
+        return np.array([])
+    if len(values) > max_values:
+        values = values[np.linspace(0, len(values) - 1, max_values).round().astype(int)]
+    n = len(values)
+    k = min(k, len(np.unique(values)))
+    if k <= 1:
+        return np.array([values[0], values[-1]])
+
+    # Sum of squared deviations of values[a:b] from prefix sums
+    s1 = np.concatenate([[0.0], np.cumsum(values)])
+    s2 = np.concatenate([[0.0], np.cumsum(values * values)])
+
+    # cost[j, i]: least total deviation of values[:i] in j classes, and
+    # start[j, i] the first value of the last of those classes
+    cost = np.full((k + 1, n + 1), np.inf)
+    cost[0, 0] = 0.0
+    start = np.zeros((k + 1, n + 1), dtype=int)
+    for j in range(1, k + 1):
+        for i in range(j, n + 1):
+            a = np.arange(j - 1, i)
+            total = s1[i] - s1[a]
+            candidates = cost[j - 1, a] + (s2[i] - s2[a]) - total * total / (i - a)
+            best = int(np.argmin(candidates))
+            cost[j, i] = candidates[best]
+            start[j, i] = a[best]
+
+    # Walk back from the last class to collect the upper bounds
+    bounds = []
+    i = n
+    for j in range(k, 0, -1):
+        bounds.append(values[i - 1])
+        i = start[j, i]
+    return np.array([values[0], *reversed(bounds)])
+
+
+def class_breaks(values, scheme='quantile', k=5):
+    """Class bounds of ``values`` with ``scheme`` (one of ``SCHEMES``)."""
+    if scheme == 'quantile':
+        return quantile_breaks(values, k)
+    if scheme == 'jenks':
+        return jenks_breaks(values, k)
+    raise ValueError(f"Unknown classification scheme {scheme!r}, expected one of {SCHEMES}")
+
+
+def classify(values, breaks):
+    """Class index per value for class bounds ``breaks``, -1 where the value is missing.
+
+    Upper bounds are inclusive, as ``jenks_breaks`` returns them.
+    """
+    import numpy as np
+
+    values = np.asarray(values, dtype=float)
+    classes = np.searchsorted(breaks[1:-1], values, side='left')
+    classes[~np.isfinite(values)] = -1
+    return classes
+
+
+def class_colors(k, cmap='Purples'):
+    """``k`` hex colors from light to dark along ``cmap``."""
+    import matplotlib
+    import numpy as np
+    from matplotlib.colors import to_hex
+
+    colormap = matplotlib.colormaps.get_cmap(cmap)
+    # Start above the lightest end so the first class stands out from missing data
+    return [to_hex(colormap(x)) for x in np.linspace(0.2, 1.0, k)]
+
+
+def _format_value(value):
+    return f'{value:,.0f}' if abs(value) >= 100 else f'{value:.3g}'
+
+
+class ChoroplethMap:
+    """Countries map that is drawn once and recolored for each indicator.
+
+    Uses the ``HighlightTemplate`` background, so extent, projection and
+    styling match the highlight map.
+    """
+
+    def __init__(self, countries, figsize=(10, 12), extent=SUBSAHARAN_EXTENT, dpi=300, crs=None):
+        from .render import HighlightTemplate
+
+        self.template = HighlightTemplate(countries, figsize=figsize, extent=extent, dpi=dpi, crs=crs)
+        self.fig = self.template.fig
+
+    def render(self, values, output_path=None, scheme='quantile', k=5, breaks=None, cmap='Purples',
+               title=None, missing_color=MISSING_COLOR, dpi=300):
+        """Color the countries by ``values`` and save to ``output_path``.
+
+        ``values`` is indexed by country key, as ``IndicatorTable.values``
+        returns it. ``breaks`` overrides the class bounds computed with
+        ``scheme``. The legend stays on the figure when no output path is
+        given. Returns the class bounds.
+        """
+        import matplotlib.patches as mpatches
+
+        with stage('classify', features=len(values), scheme=scheme):
+            if breaks is None:
+                breaks = class_breaks(values.to_numpy(), scheme, k)
+            classes = classify(values.to_numpy(), breaks)
+            colors = class_colors(max(len(breaks) - 1, 1), cmap)
+            key_colors = {key: colors[c] for key, c in zip(values.index, classes) if c >= 0}
+
+        with stage('plot', map='choropleth'):
+            self.template.color_countries(key_colors, missing_color)
+
+            handles = [mpatches.Patch(color=color, label=f'{_format_value(low)} – {_format_value(high)}')
+                       for color, low, high in zip(colors, breaks[:-1], breaks[1:])]
+            if (classes < 0).any():
+                handles.append(mpatches.Patch(color=missing_color, label='No data'))
+            legend = self.template.ax.legend(
+                handles=handles,
+                loc='lower left',
+                frameon=True,
+                framealpha=0.9,
+                edgecolor='#dddddd',
+                facecolor='white',
+                fontsize=8,
+                title=title or values.name
+            )
+            legend.get_title().set_fontweight('bold')
+
+        if output_path is not None:
+            save_figure(self.fig, output_path, dpi=dpi, bbox_inches='tight')
+            legend.remove()
+        return breaks
+
+    def close(self):
+        self.template.close()
+
+
+def render_choropleth(countries, values, output_path='choropleth.png', scheme='quantile', k=5, cmap='Purples',
+                      title=None, dpi=300, crs=None):
+    """Render a single choropleth map of ``values`` (indexed by country key) and return the figure."""
+    choropleth = ChoroplethMap(countries, dpi=dpi, crs=crs)
+    choropleth.render(values, None, scheme=scheme, k=k, cmap=cmap, title=title)
+    if output_path:
+        save_figure(choropleth.fig, output_path, dpi=dpi, bbox_inches='tight')
+    return choropleth.fig
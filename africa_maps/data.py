@@ -0,0 +1,257 @@
+"""Loading of the Natural Earth countries layer.
+
+The full world shapefile is parsed once, filtered down to Sub-Saharan Africa
+and written to a GeoParquet cache under ``data/cache``. Later runs read the
+cache directly for as long as the shapefile is unchanged.
+
+geopandas is only imported when data is actually read; downloads go
+through ``fetch``.
+"""
+import hashlib
+import json
+import os
+import re
+
+from .instrument import layer_counts, stage
+from .territories import DERIVED_TERRITORIES, split_territories, territories_key
+
+# Data directory at the repository root
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+CACHE_DIR = os.path.join(DATA_DIR, 'cache')
+
+# Natural Earth countries, coarsest resolution first, with the median
+# segment length of each in degrees (measured on the African outlines of
+# 110m; 50m and 10m scaled by their vertex counts)
+RESOLUTIONS = ('110m', '50m', '10m')
+RESOLUTION_DETAIL = {'110m': 0.6, '50m': 0.1, '10m': 0.02}
+DEFAULT_RESOLUTION = '110m'
+
+# Median segment length, in output pixels, that still draws as a smooth
+# outline. Outlines are simplified to half a pixel before plotting, which
+# leaves segments several pixels long, so data finer than this only adds
+# vertices that are simplified away again.
+SEGMENT_PIXELS = 8.0
+
+
+def shapefile_path_for(resolution=DEFAULT_RESOLUTION, data_dir=DATA_DIR):
+    """Path of the Natural Earth countries shapefile at ``resolution``."""
+    if resolution not in RESOLUTIONS:
+        raise ValueError(f"Unknown resolution {resolution!r}, expected one of {RESOLUTIONS}")
+    return os.path.join(data_dir, f'ne_{resolution}_admin_0_countries.shp')
+
+
+SHAPEFILE_PATH = shapefile_path_for(DEFAULT_RESOLUTION)
+
+# Shapefile components that affect the parsed result
+_SHAPEFILE_PARTS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+_MANIFEST_NAME = 'manifest.json'
+_CACHE_PREFIX = 'subsaharan_africa-'
+_WORLD_CACHE_PREFIX = 'world-'
+
+
+def download_countries(shapefile_path=SHAPEFILE_PATH, url=None, mirror=None):
+    """Download and extract the Natural Earth countries if they are missing.
+
+    See ``fetch.fetch_dataset`` for resuming, checksums and offline mirrors.
+    """
+    from .fetch import fetch_dataset
+
+    data_dir, filename = os.path.split(shapefile_path)
+    name, _ = os.path.splitext(filename)
+    return fetch_dataset(name, data_dir, url=url, mirror=mirror)
+
+
+def choose_resolution(extent, dpi, figsize, pixel_tolerance=SEGMENT_PIXELS):
+    """Coarsest resolution whose median segment is at most ``pixel_tolerance`` output pixels.
+
+    ``extent`` is ``(min lon, max lon, min lat, max lat)``; the map is assumed
+    to fill ``figsize`` (inches) at ``dpi`` with geopandas' lon/lat aspect.
+    Falls back to the finest resolution when none is detailed enough. For
+    the Sub-Saharan map at 10x12 inches::
+
+        >>> [choose_resolution((-18, 52, -35, 15), dpi, (10, 12)) for dpi in (72, 100, 300, 600)]
+        ['110m', '50m', '50m', '10m']
+    """
+    from .geometry import degrees_per_pixel
+
+    pixel_size = degrees_per_pixel(extent, dpi, figsize)
+    for resolution in RESOLUTIONS:
+        if RESOLUTION_DETAIL[resolution] <= pixel_tolerance * pixel_size:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def load_world(shapefile_path=SHAPEFILE_PATH, use_cache=False, cache_dir=CACHE_DIR):
+    """Read the full, unfiltered world countries layer.
+
+    With ``use_cache`` it goes through its own GeoParquet cache, like
+    ``load_countries``.
+    """
+    import geopandas as gpd
+
+    if use_cache:
+        return load_cached_layer(shapefile_path, _WORLD_CACHE_PREFIX, cache_dir=cache_dir)
+    download_countries(shapefile_path)
+    return gpd.read_file(shapefile_path)
+
+
+def _hash_shapefile(shapefile_path):
+    """SHA-256 over all shapefile components that exist on disk."""
+    digest = hashlib.sha256()
+    base, _ = os.path.splitext(shapefile_path)
+    for ext in _SHAPEFILE_PARTS:
+        part = base + ext
+        if not os.path.exists(part):
+            continue
+        digest.update(ext.encode())
+        with open(part, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+    return digest.hexdigest()
+
+
+def shapefile_fingerprint(shapefile_path=SHAPEFILE_PATH, cache_dir=CACHE_DIR):
+    """Return the content hash of a shapefile.
+
+    The hash is remembered in a small manifest together with the file's mtime
+    and size, so it is only recomputed when the shapefile is touched.
+    """
+    stat = os.stat(shapefile_path)
+    manifest_path = os.path.join(cache_dir, _MANIFEST_NAME)
+    manifest = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            try:
+                manifest = json.load(f)
+            except ValueError:
+                manifest = {}
+
+    key = os.path.abspath(shapefile_path)
+    entry = manifest.get(key)
+    if entry and entry['mtime'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+        return entry['sha256']
+
+    sha256 = _hash_shapefile(shapefile_path)
+    manifest[key] = {'mtime': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': sha256}
+    os.makedirs(cache_dir, exist_ok=True)
+    tmp_path = manifest_path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(tmp_path, manifest_path)
+    return sha256
+
+
+def _write_cache(gdf, cache_path, prefix):
+    """Write the cache atomically; return False when GeoParquet is unavailable."""
+    tmp_path = cache_path + '.tmp'
+    try:
+        gdf.to_parquet(tmp_path, index=True)
+    except ImportError:
+        # pyarrow is optional - without it we simply don't cache
+        return False
+    os.replace(tmp_path, cache_path)
+
+    # Drop caches built from older versions of the shapefile. Only names of
+    # the form <prefix><fingerprint>.parquet, since a shorter prefix (one
+    # without a key) is also the start of other variants' names
+    cache_dir = os.path.dirname(cache_path)
+    pattern = re.compile(re.escape(prefix) + r'[0-9a-f]{16}\.parquet')
+    for name in os.listdir(cache_dir):
+        path = os.path.join(cache_dir, name)
+        if pattern.fullmatch(name) and path != cache_path:
+            os.remove(path)
+    return True
+
+
+def _filter(world):
+    from .regions import select_region
+
+    with stage('filter', input_features=len(world)) as st:
+        africa = select_region(world)
+        st.set(features=len(africa))
+    return africa
+
+
+def load_countries(shapefile_path=None, cache_dir=CACHE_DIR, use_cache=True,
+                   resolution=DEFAULT_RESOLUTION, extent=None, dpi=300, figsize=(10, 12),
+                   pixel_tolerance=SEGMENT_PIXELS, territories=DERIVED_TERRITORIES, admin1_path=None):
+    """Load the Sub-Saharan African countries, using the GeoParquet cache when possible.
+
+    ``resolution`` is one of ``RESOLUTIONS`` or ``'auto'``, which picks the
+    coarsest one that is detailed enough for ``extent``/``dpi``/``figsize``
+    (see ``choose_resolution``). Each resolution is cached separately. An
+    explicit ``shapefile_path`` overrides the resolution.
+
+    ``territories`` the dataset lacks are split off their parent countries
+    (see ``territories.split_territories``), from the admin-1 units in
+    ``admin1_path`` if given; the result is cached with the countries.
+    """
+    from .regions import SUBSAHARAN_EXTENT
+
+    if shapefile_path is None:
+        if resolution == 'auto':
+            resolution = choose_resolution(extent or SUBSAHARAN_EXTENT, dpi, figsize, pixel_tolerance)
+        shapefile_path = shapefile_path_for(resolution, os.path.dirname(SHAPEFILE_PATH))
+
+    def select(world):
+        africa = _filter(world)
+        if not territories:
+            return africa
+        admin1 = None
+        if admin1_path is not None:
+            from .admin1 import Admin1Layer, load_admin1
+
+            admin1 = Admin1Layer(load_admin1(admin1_path, cache_dir))
+        return split_territories(africa, territories, admin1)
+
+    if not use_cache:
+        with stage('load', source='shapefile') as st:
+            world = load_world(shapefile_path)
+            if st:
+                st.set(**layer_counts(world))
+        return select(world)
+
+    key = territories_key(territories, admin1_path) if territories else None
+    return load_cached_layer(shapefile_path, _CACHE_PREFIX, select, cache_dir, key=key)
+
+
+def load_cached_layer(shapefile_path, cache_prefix, select=None, cache_dir=CACHE_DIR, columns=None,
+                      key=None):
+    """Read ``shapefile_path`` through ``select`` and cache the result as GeoParquet.
+
+    The cache is keyed by the shapefile's content hash and ``cache_prefix``,
+    so every kind of layer built from a shapefile gets its own file.
+    ``columns`` limits the attribute columns read from the shapefile, and
+    ``key`` identifies any settings ``select`` depends on; each key keeps
+    its own cache file, and a new shapefile version only replaces the
+    file of the same key.
+    """
+    import geopandas as gpd
+
+    download_countries(shapefile_path)
+    fingerprint = shapefile_fingerprint(shapefile_path, cache_dir)
+    dataset = os.path.splitext(os.path.basename(shapefile_path))[0]
+    prefix = f'{cache_prefix}{dataset}-'
+    if key:
+        prefix += f'{hashlib.sha256(str(key).encode()).hexdigest()[:8]}-'
+    cache_path = os.path.join(cache_dir, f'{prefix}{fingerprint[:16]}.parquet')
+    if os.path.exists(cache_path):
+        try:
+            with stage('load', source='cache') as st:
+                layer = gpd.read_parquet(cache_path)
+                if st:
+                    st.set(**layer_counts(layer))
+            return layer
+        except (ImportError, ValueError, OSError):
+            # Missing pyarrow or a corrupt cache file - rebuild from the shapefile
+            pass
+
+    with stage('load', source='shapefile') as st:
+        layer = gpd.read_file(shapefile_path, columns=columns)
+        if st:
+            st.set(**layer_counts(layer))
+    if select is not None:
+        layer = select(layer)
+    os.makedirs(cache_dir, exist_ok=True)
+    _write_cache(layer, cache_path, prefix)
+    return layer
@@ -0,0 +1,171 @@
+"""Draw.io (mxGraph) output for the migration flow diagram.
+
+The diagram is built from a flow table of ``(origin, destination, volume)``
+rows. Every country taking part gets a hidden anchor vertex placed at its
+label point, projected with the same lon/lat -> pixel transform as the
+saved background PNG, and every flow becomes an edge whose stroke width
+scales with its volume. The XML is streamed to the file one cell at a
+time, so tables with thousands of flows stay cheap.
+
+Writing the diagram only needs the standard library; ``country_anchors``
+is the one helper that reads geometry.
+"""
+import logging
+from xml.sax.saxutils import quoteattr
+
+from .instrument import stage
+
+logger = logging.getLogger(__name__)
+
+# Migration flows shown on the map: (origin, destination, volume)
+MIGRATION_FLOWS = [
+    ('COD', 'KEN', 1),
+    ('COD', 'ZAF', 1),
+    ('SOM', 'KEN', 1),
+    ('SOM', 'ZAF', 1),
+    ('SOMALILAND', 'KEN', 1),
+    ('SOMALILAND', 'ZAF', 1),
+]
+
+# Edge color when the origin has no palette entry
+DEFAULT_FLOW_COLOR = '#8c96c6'
+
+_ANCHOR_SIZE = 10
+_ANCHOR_STYLE = 'ellipse;whiteSpace=wrap;html=1;aspect=fixed;fillColor=none;strokeColor=none;'
+_EDGE_STYLE = ('html=1;curved=1;startArrow=none;startFill=0;endArrow=classic;endFill=1;'
+               'strokeWidth={width:.2f};strokeColor={color};')
+_IMAGE_STYLE = ('shape=image;verticalLabelPosition=bottom;labelBackgroundColor=#ffffff;'
+                'verticalAlign=top;aspect=fixed;imageAspect=0;image={image};')
+
+
+def country_anchors(countries, transform, names, crs=None):
+    """Pixel position of the label point of each country in ``names``.
+
+    ``names`` are ISO codes or country names as used in a flow table;
+    ``transform`` is the ``render.GeoTransform`` of the saved image, and
+    ``crs`` the projection the image was drawn in, if any. Names that match
+    no country are left out.
+    """
+    from .labels import country_points
+
+    points = country_points(countries, names)
+    if crs is not None and points:
+        from .projection import GEOGRAPHIC_CRS, transform_coords
+
+        xs, ys = transform_coords([p[0] for p in points.values()], [p[1] for p in points.values()],
+                                  GEOGRAPHIC_CRS, crs)
+        points = {name: (float(x), float(y)) for name, x, y in zip(points, xs, ys)}
+    return {name: (transform.x0 + x * transform.sx, transform.y0 - y * transform.sy)
+            for name, (x, y) in points.items()}
+
+
+def _flow_rows(flows):
+    """(origin, destination, volume) tuples from a DataFrame or an iterable."""
+    if hasattr(flows, 'itertuples'):
+        return flows.iloc[:, :3].itertuples(index=False, name=None)
+    return iter(flows)
+
+
+def flow_widths(volumes, min_width=1.0, max_width=8.0, low=None, high=None):
+    """Stroke width per volume, linear between ``min_width`` and ``max_width``.
+
+    ``low`` and ``high`` default to the smallest and largest volume; pass
+    them to keep widths comparable across several tables.
+    """
+    if low is None:
+        low = min(volumes, default=0.0)
+    if high is None:
+        high = max(volumes, default=0.0)
+    if high == low:
+        return [2.0] * len(volumes)
+    return [min_width + (max_width - min_width) * (volume - low) / (high - low) for volume in volumes]
+
+
+def _cell_id(name):
+    return 'anchor_' + ''.join(c if c.isalnum() else '_' for c in str(name)).lower()
+
+
+def write_drawio(flows=MIGRATION_FLOWS, anchors=None, image_size=(1000, 1000),
+                 output_path='migration_flows.drawio', image='subsaharan_africa_highlighted.png',
+                 colors=None, display_width=1000, origin=(50, 50), min_width=1.0, max_width=8.0,
+                 waypoints=None):
+    """Stream a Draw.io file with ``image`` as background and one edge per flow.
+
+    ``anchors`` maps every flow endpoint to its pixel position in ``image``
+    (see ``country_anchors``) and ``image_size`` is the image's pixel size.
+    The image is shown ``display_width`` units wide at ``origin``. Edge
+    colors come from ``colors`` keyed by origin; stroke widths scale
+    linearly with volume between ``min_width`` and ``max_width``.
+    ``waypoints``, when given, holds a list of pixel points per flow that
+    the edge is routed through (e.g. bundled flows).
+    """
+    anchors = anchors or {}
+    rows = [(o, d, float(v)) for o, d, v in _flow_rows(flows)]
+    if waypoints is None:
+        waypoints = [()] * len(rows)
+    skipped = [(o, d) for o, d, v in rows if o not in anchors or d not in anchors]
+    kept = [i for i, (o, d, v) in enumerate(rows) if o in anchors and d in anchors]
+    rows = [rows[i] for i in kept]
+    waypoints = [waypoints[i] for i in kept]
+    if skipped:
+        logger.warning("Skipping %d flows without a country anchor, e.g. %s", len(skipped), skipped[0])
+
+    scale = display_width / image_size[0]
+    ox, oy = origin
+    widths = flow_widths([v for _, _, v in rows], min_width, max_width)
+
+    colors = colors or {}
+    used = dict.fromkeys(name for o, d, _ in rows for name in (o, d))
+    with stage('drawio', flows=len(rows), anchors=len(used)) as st, \
+            open(output_path, 'w', encoding='utf-8') as f:
+        f.write('<?xml version="1.0" encoding="UTF-8"?>\n'
+                '<mxfile host="app.diagrams.net" type="device">\n'
+                '  <diagram id="migration-map" name="Migration Map">\n'
+                '    <mxGraphModel grid="1" gridSize="10" guides="1" tooltips="1" connect="1" arrows="1" '
+                'fold="1" page="1" pageScale="1" pageWidth="1169" pageHeight="1654" background="#ffffff" '
+                'math="0" shadow="0">\n'
+                '      <root>\n'
+                '        <mxCell id="0" />\n'
+                '        <mxCell id="1" parent="0" />\n')
+
+        # Background map image
+        f.write(f'        <mxCell id="map" value="" style={quoteattr(_IMAGE_STYLE.format(image=image))} '
+                f'vertex="1" parent="1">\n'
+                f'          <mxGeometry x="{ox}" y="{oy}" width="{display_width}" '
+                f'height="{image_size[1] * scale:.1f}" as="geometry" />\n'
+                f'        </mxCell>\n')
+
+        # Hidden reference points for countries
+        for name in used:
+            px, py = anchors[name]
+            x = ox + px * scale - _ANCHOR_SIZE / 2
+            y = oy + py * scale - _ANCHOR_SIZE / 2
+            f.write(f'        <mxCell id={quoteattr(_cell_id(name))} value="" style="{_ANCHOR_STYLE}" '
+                    f'vertex="1" parent="1">\n'
+                    f'          <mxGeometry x="{x:.1f}" y="{y:.1f}" width="{_ANCHOR_SIZE}" '
+                    f'height="{_ANCHOR_SIZE}" as="geometry" />\n'
+                    f'        </mxCell>\n')
+
+        # Migration flows
+        for n, ((o, d, volume), width, points) in enumerate(zip(rows, widths, waypoints)):
+            style = _EDGE_STYLE.format(width=width, color=colors.get(o, DEFAULT_FLOW_COLOR))
+            f.write(f'        <mxCell id="flow_{n}" style={quoteattr(style)} edge="1" parent="1" '
+                    f'source={quoteattr(_cell_id(o))} target={quoteattr(_cell_id(d))}>\n')
+            if len(points):
+                f.write('          <mxGeometry relative="1" as="geometry">\n'
+                        '            <Array as="points">\n')
+                for px, py in points:
+                    f.write(f'              <mxPoint x="{ox + px * scale:.1f}" y="{oy + py * scale:.1f}" />\n')
+                f.write('            </Array>\n'
+                        '          </mxGeometry>\n')
+            else:
+                f.write('          <mxGeometry relative="1" as="geometry" />\n')
+            f.write('        </mxCell>\n')
+
+        f.write('      </root>\n'
+                '    </mxGraphModel>\n'
+                '  </diagram>\n'
+                '</mxfile>\n')
+        if st:
+            st.set(output_bytes=f.tell())
+    return output_path
@@ -0,0 +1,269 @@
+"""Streaming, resumable download of Natural Earth datasets.
+
+Archives are streamed in chunks to a ``.part`` file, so an interrupted
+download resumes with an HTTP range request. Each archive carries a
+``<name>.VERSION.txt`` member; the SHA-256 of every shapefile member is
+checked against the checksums pinned for that version in the package's
+``checksums.json`` before anything is extracted. Versions without pinned
+checksums are refused unless recording is switched on (``record=True`` or
+``NATURAL_EARTH_RECORD_CHECKSUMS=1``), which pins the downloaded ones for
+the maintainer to commit. Only the shapefile members are extracted.
+
+Air-gapped hosts can point ``mirror`` (or the ``NATURAL_EARTH_MIRROR``
+environment variable) at a local directory or ``file://`` URL holding the
+archives or the already extracted files; the network is never touched then.
+"""
+import hashlib
+import json
+import logging
+import os
+import shutil
+import time
+import zipfile
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+NATURAL_EARTH_BASE_URL = "https://naciscdn.org/naturalearth"
+MIRROR_ENV = 'NATURAL_EARTH_MIRROR'
+RECORD_ENV = 'NATURAL_EARTH_RECORD_CHECKSUMS'
+
+CHUNK_SIZE = 1 << 16
+
+# Pinned per-member checksums, keyed '<name>@<version>'
+CHECKSUMS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'checksums.json')
+
+# Archive members needed to read a dataset; README, etc. are skipped. The
+# .shp goes last because its presence marks a complete dataset.
+DATASET_MEMBERS = ('.shx', '.dbf', '.prj', '.cpg', '.VERSION.txt', '.shp')
+
+# Members whose checksums are pinned
+CHECKSUM_MEMBERS = ('.shp', '.shx', '.dbf', '.prj', '.cpg')
+
+
+class ChecksumError(ValueError):
+    """A downloaded dataset does not match, or has no, pinned checksums."""
+
+
+def dataset_url(name):
+    """Natural Earth download URL for e.g. ``ne_110m_admin_0_countries``."""
+    scale = name.split('_')[1]
+    return f"{NATURAL_EARTH_BASE_URL}/{scale}/cultural/{name}.zip"
+
+
+def sha256_file(path):
+    with open(path, 'rb') as f:
+        return _sha256_stream(f)
+
+
+def _sha256_stream(f):
+    digest = hashlib.sha256()
+    for chunk in iter(lambda: f.read(1 << 20), b''):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _local_path(location):
+    """Filesystem path for a ``file://`` URL or plain path, else None."""
+    parsed = urlparse(location)
+    if parsed.scheme == 'file':
+        return unquote(parsed.path)
+    if not parsed.scheme or (len(parsed.scheme) == 1 and os.name == 'nt'):
+        return location
+    return None
+
+
+def _stream_http(url, dest, retries=3, chunk_size=CHUNK_SIZE, timeout=60):
+    """Stream ``url`` to ``dest``, resuming from ``dest + '.part'`` when present."""
+    import requests
+
+    part_path = dest + '.part'
+    for attempt in range(retries + 1):
+        offset = os.path.getsize(part_path) if os.path.exists(part_path) else 0
+        headers = {'Range': f'bytes={offset}-'} if offset else {}
+        try:
+            with requests.get(url, stream=True, headers=headers, timeout=timeout) as response:
+                if response.status_code == 416:
+                    # Nothing left to fetch - the part file is already complete
+                    break
+                response.raise_for_status()
+                # A server that ignores the range sends the whole file again
+                mode = 'ab' if response.status_code == 206 else 'wb'
+                with open(part_path, mode) as f:
+                    for chunk in response.iter_content(chunk_size=chunk_size):
+                        f.write(chunk)
+            break
+        except (requests.ConnectionError, requests.Timeout,
+                requests.exceptions.ChunkedEncodingError):
+            if attempt == retries:
+                raise
+            time.sleep(2 ** attempt)
+    os.replace(part_path, dest)
+    return dest
+
+
+def _copy_file(source, dest, chunk_size=CHUNK_SIZE):
+    tmp_path = dest + '.part'
+    with open(source, 'rb') as src, open(tmp_path, 'wb') as dst:
+        shutil.copyfileobj(src, dst, chunk_size)
+    os.replace(tmp_path, dest)
+    return dest
+
+
+def _archive_version(zipf, name):
+    member = f'{name}.VERSION.txt'
+    if member not in zipf.namelist():
+        return None
+    return zipf.read(member).decode('utf-8', 'replace').strip()
+
+
+def load_checksums(checksums_path=CHECKSUMS_PATH):
+    if not os.path.exists(checksums_path):
+        return {}
+    with open(checksums_path) as f:
+        return json.load(f)
+
+
+def verify_members(name, version, digests, record=None, checksums_path=CHECKSUMS_PATH):
+    """Check member checksums (``{suffix: sha256}``) against those pinned for ``name@version``.
+
+    Raises ``ChecksumError`` on a mismatch, and when nothing is pinned for
+    that version unless ``record`` (default: ``$NATURAL_EARTH_RECORD_CHECKSUMS``)
+    is set, in which case ``digests`` are pinned.
+    """
+    if record is None:
+        record = os.environ.get(RECORD_ENV, '') not in ('', '0')
+    key = f'{name}@{version}'
+    checksums = load_checksums(checksums_path)
+    pinned = checksums.get(key)
+
+    if pinned is None:
+        if not record:
+            raise ChecksumError(f"No checksums pinned for {key} in {checksums_path}; set {RECORD_ENV}=1 "
+                                f"to record them from this download")
+        logger.warning("Pinning checksums of %s in %s", key, checksums_path)
+        checksums[key] = dict(sorted(digests.items()))
+        # Replaced atomically, so an interrupted run never leaves a truncated file
+        tmp_path = checksums_path + '.part'
+        with open(tmp_path, 'w') as f:
+            json.dump(checksums, f, indent=2, sort_keys=True)
+            f.write('\n')
+        os.replace(tmp_path, checksums_path)
+        return
+
+    for suffix, expected in pinned.items():
+        actual = digests.get(suffix)
+        if actual is None:
+            raise ChecksumError(f"{name}{suffix} (version {version}) is missing")
+        if actual != expected.lower():
+            raise ChecksumError(f"{name}{suffix} (version {version}) has SHA-256 {actual}, expected {expected}")
+
+
+def verify_archive(archive_path, name, expected_sha256=None, record=None, checksums_path=CHECKSUMS_PATH):
+    """Check an archive's shapefile members against the checksums pinned for its version.
+
+    The version comes from the archive's ``<name>.VERSION.txt`` member; an
+    archive without it, or without ``<name>.shp``, is not the dataset and
+    raises ``ChecksumError``. ``expected_sha256`` additionally checks the
+    whole archive. See ``verify_members`` for ``record``. Returns the
+    archive's SHA-256.
+    """
+    actual = sha256_file(archive_path)
+    if expected_sha256 and expected_sha256.lower() != actual:
+        raise ChecksumError(f"{os.path.basename(archive_path)} has SHA-256 {actual}, expected {expected_sha256}")
+
+    with zipfile.ZipFile(archive_path) as zipf:
+        version = _archive_version(zipf, name)
+        if version is None:
+            raise ChecksumError(f"{os.path.basename(archive_path)} has no {name}.VERSION.txt; "
+                                f"is it the {name} archive?")
+        members = {os.path.basename(info.filename): info for info in zipf.infolist()}
+        digests = {}
+        for suffix in CHECKSUM_MEMBERS:
+            info = members.get(name + suffix)
+            if info is not None:
+                with zipf.open(info) as f:
+                    digests[suffix] = _sha256_stream(f)
+    if '.shp' not in digests:
+        raise ChecksumError(f"{os.path.basename(archive_path)} has no {name}.shp")
+    verify_members(name, version, digests, record, checksums_path)
+    return actual
+
+
+def extract_members(archive_path, name, data_dir, suffixes=DATASET_MEMBERS):
+    """Extract only ``name`` + ``suffixes`` members of the archive into ``data_dir``."""
+    extracted = []
+    with zipfile.ZipFile(archive_path) as zipf:
+        infos = sorted(zipf.infolist(), key=lambda info: info.filename.endswith('.shp'))
+        for info in infos:
+            member = os.path.basename(info.filename)
+            if not any(member == name + suffix for suffix in suffixes):
+                continue
+            target = os.path.join(data_dir, member)
+            with zipf.open(info) as src, open(target + '.part', 'wb') as dst:
+                shutil.copyfileobj(src, dst, CHUNK_SIZE)
+            os.replace(target + '.part', target)
+            extracted.append(target)
+    return extracted
+
+
+def fetch_dataset(name, data_dir, url=None, mirror=None, expected_sha256=None, retries=3, record=None):
+    """Make sure the shapefile ``<data_dir>/<name>.shp`` exists and return its path.
+
+    The archive is taken from ``mirror`` (a directory or ``file://`` URL,
+    defaulting to ``$NATURAL_EARTH_MIRROR``) when set, otherwise streamed from
+    ``url`` (Natural Earth by default, which may itself be a ``file://`` URL).
+    Members are verified with ``verify_archive`` (or ``verify_members`` for
+    a mirror of extracted files) before they are put in place.
+    """
+    shapefile_path = os.path.join(data_dir, f'{name}.shp')
+    if os.path.exists(shapefile_path):
+        return shapefile_path
+
+    os.makedirs(data_dir, exist_ok=True)
+    archive_path = os.path.join(data_dir, f'{name}.zip')
+    mirror = mirror or os.environ.get(MIRROR_ENV)
+
+    if mirror:
+        mirror_dir = _local_path(mirror)
+        if mirror_dir is None:
+            raise ValueError(f"Mirror must be a local directory or file:// URL, got {mirror!r}")
+        mirror_archive = os.path.join(mirror_dir, f'{name}.zip')
+        if os.path.exists(mirror_archive):
+            logger.info("Copying %s from mirror %s...", name, mirror_dir)
+            _copy_file(mirror_archive, archive_path)
+        elif os.path.exists(os.path.join(mirror_dir, f'{name}.shp')):
+            # Mirror holds the extracted files
+            version_path = os.path.join(mirror_dir, f'{name}.VERSION.txt')
+            if not os.path.exists(version_path):
+                raise ChecksumError(f"{name}.VERSION.txt not found in mirror {mirror_dir}")
+            with open(version_path, encoding='utf-8', errors='replace') as f:
+                version = f.read().strip()
+            digests = {suffix: sha256_file(os.path.join(mirror_dir, name + suffix)) for suffix in CHECKSUM_MEMBERS
+                       if os.path.exists(os.path.join(mirror_dir, name + suffix))}
+            verify_members(name, version, digests, record)
+            for suffix in DATASET_MEMBERS:
+                source = os.path.join(mirror_dir, name + suffix)
+                if os.path.exists(source):
+                    _copy_file(source, os.path.join(data_dir, name + suffix))
+            return shapefile_path
+        else:
+            raise FileNotFoundError(f"{name} not found in mirror {mirror_dir}")
+    else:
+        url = url or dataset_url(name)
+        local_source = _local_path(url)
+        if local_source is not None:
+            _copy_file(local_source, archive_path)
+        else:
+            logger.info("Downloading Natural Earth data from %s...", url)
+            _stream_http(url, archive_path, retries=retries)
+
+    try:
+        verify_archive(archive_path, name, expected_sha256, record)
+        extract_members(archive_path, name, data_dir)
+    finally:
+        os.remove(archive_path)
+    if not os.path.exists(shapefile_path):
+        raise FileNotFoundError(f"{name}.shp was not extracted to {data_dir}")
+    logger.info("Download and extraction complete.")
+    return shapefile_path
@@ -0,0 +1,242 @@
+"""Migration flow layer for full origin/destination matrices.
+
+Flow tables (CSV or Parquet) are read lazily in column-pruned chunks and
+aggregated per (origin, destination) pair with a NumPy group-by. After
+thresholding, endpoints are clustered by great-circle distance, flows
+between the same pair of clusters are bundled through a shared control
+point, and the whole layer is drawn as a single ``LineCollection`` of
+quadratic curves. The same bundles can be written to Draw.io, with the
+control point as edge waypoint::
+
+    flows = threshold_flows(aggregate_flows(read_flows('flows.parquet')), top=500)
+    bundled = bundle_flows(flows, load_countries())
+    render_flow_map(load_countries(), bundled, 'flows.png')
+"""
+import os
+from collections import namedtuple
+
+from .regions import SUBSAHARAN_EXTENT
+from .render import FOCUS_COLORS, HighlightTemplate, save_figure
+
+FLOW_COLUMNS = ('origin', 'destination', 'volume')
+
+# Mean Earth radius, for great-circle distances between endpoints
+EARTH_RADIUS_KM = 6371.0
+
+# Flows with their endpoints and bundle control point (lon/lat), plus the
+# sampled curves as an (n flows, samples, 2) array
+BundledFlows = namedtuple('BundledFlows', ['flows', 'curves'])
+
+
+def read_flows(path, columns=FLOW_COLUMNS, chunksize=1_000_000):
+    """Yield ``origin``/``destination``/``volume`` chunks of a CSV or Parquet flow table.
+
+    ``columns`` names the table's origin, destination and volume columns;
+    no other columns are read.
+    """
+    import pandas as pd
+
+    columns = list(columns)
+    if os.path.splitext(path)[1].lower() in ('.parquet', '.pq'):
+        import pyarrow.parquet as pq
+
+        for batch in pq.ParquetFile(path).iter_batches(batch_size=chunksize, columns=columns):
+            yield batch.to_pandas()[columns].set_axis(FLOW_COLUMNS, axis=1)
+    else:
+        for chunk in pd.read_csv(path, usecols=columns, chunksize=chunksize):
+            yield chunk[columns].set_axis(FLOW_COLUMNS, axis=1)
+
+
+def _group_sum(origins, destinations, volumes):
+    """Sum ``volumes`` per (origin, destination) pair with np.unique/bincount."""
+    import numpy as np
+
+    names, codes = np.unique(np.concatenate([origins, destinations]), return_inverse=True)
+    n = len(origins)
+    pairs = codes[:n].astype(np.int64) * len(names) + codes[n:]
+    unique_pairs, inverse = np.unique(pairs, return_inverse=True)
+    sums = np.bincount(inverse, weights=volumes)
+    return names[unique_pairs // len(names)], names[unique_pairs % len(names)], sums
+
+
+def aggregate_flows(chunks, drop_self=True):
+    """Total volume per (origin, destination) pair, largest first.
+
+    ``chunks`` is a flow DataFrame or an iterable of them, e.g. from
+    ``read_flows``; each chunk is reduced as it arrives.
+    """
+    import numpy as np
+    import pandas as pd
+
+    if isinstance(chunks, pd.DataFrame):
+        chunks = [chunks]
+
+    partials = []
+    for chunk in chunks:
+        chunk = chunk.dropna(subset=list(FLOW_COLUMNS))
+        partials.append(_group_sum(chunk.iloc[:, 0].astype(str).to_numpy(),
+                                   chunk.iloc[:, 1].astype(str).to_numpy(),
+                                   chunk.iloc[:, 2].to_numpy(dtype=float)))
+    if not partials:
+        return pd.DataFrame({column: [] for column in FLOW_COLUMNS})
+
+    origins, destinations, volumes = (np.concatenate(part) for part in zip(*partials))
+    origins, destinations, volumes = _group_sum(origins, destinations, volumes)
+    flows = pd.DataFrame({'origin': origins, 'destination': destinations, 'volume': volumes})
+    if drop_self:
+        flows = flows[flows['origin'] != flows['destination']]
+    return flows.sort_values('volume', ascending=False, kind='stable').reset_index(drop=True)
+
+
+def threshold_flows(flows, min_volume=None, top=None):
+    """Keep flows of at least ``min_volume`` and/or only the ``top`` largest."""
+    if min_volume is not None:
+        flows = flows[flows['volume'] >= min_volume]
+    if top is not None:
+        flows = flows.nlargest(top, 'volume')
+    return flows.reset_index(drop=True)
+
+
+def _endpoint_clusters(points, weights, radius_km):
+    """Cluster label of each lon/lat point, grouping points within ``radius_km`` of a leader.
+
+    The heaviest unassigned point leads the next cluster and takes every
+    unassigned point within ``radius_km`` of it, so busy hubs gather their
+    neighbours rather than the other way round.
+    """
+    import numpy as np
+
+    lon, lat = np.radians(points).T
+    cos_angle = (np.sin(lat)[:, None] * np.sin(lat)
+                 + np.cos(lat)[:, None] * np.cos(lat) * np.cos(lon[:, None] - lon))
+    near = EARTH_RADIUS_KM * np.arccos(np.clip(cos_angle, -1.0, 1.0)) <= radius_km
+
+    labels = np.full(len(points), -1)
+    for leader in np.argsort(-weights, kind='stable'):
+        if labels[leader] < 0:
+            labels[near[leader] & (labels < 0)] = labels.max() + 1
+    return labels
+
+
+def bundle_flows(flows, countries, radius_km=800.0, curvature=0.2, samples=24):
+    """Bundle flows between nearby endpoints and sample their curves.
+
+    Endpoints are the countries' label points, clustered so that every
+    country lies within ``radius_km`` of its cluster's busiest country.
+    Flows from the same origin cluster to the same destination cluster
+    share one control point: the volume-weighted mean of their own bent
+    midpoints, ``curvature`` times their length to the side. Flows with
+    unknown endpoints are dropped.
+    """
+    import numpy as np
+
+    from .labels import country_points
+
+    points = country_points(countries, np.concatenate([flows['origin'], flows['destination']]))
+    known = flows['origin'].isin(points.keys()) & flows['destination'].isin(points.keys())
+    flows = flows[known].reset_index(drop=True)
+
+    start = np.array([points[name] for name in flows['origin']], dtype=float).reshape(-1, 2)
+    end = np.array([points[name] for name in flows['destination']], dtype=float).reshape(-1, 2)
+    volume = flows['volume'].to_numpy(dtype=float)
+
+    # Each flow bends to its right by `curvature` of its length
+    direction = end - start
+    bent = (start + end) / 2 + curvature * np.column_stack([direction[:, 1], -direction[:, 0]])
+
+    # Shared control point per pair of endpoint clusters
+    names, endpoint = np.unique(np.concatenate([flows['origin'], flows['destination']]).astype(str),
+                                return_inverse=True)
+    endpoint = endpoint.ravel()
+    n = len(flows)
+    coords = np.zeros((len(names), 2))
+    coords[endpoint[:n]], coords[endpoint[n:]] = start, end
+    clusters = _endpoint_clusters(coords, np.bincount(endpoint, weights=np.tile(volume, 2),
+                                                      minlength=len(names)), radius_km)
+    _, group = np.unique(np.column_stack([clusters[endpoint[:n]], clusters[endpoint[n:]]]), axis=0,
+                         return_inverse=True)
+    group = group.ravel()
+    totals = np.bincount(group, weights=volume)
+    safe_totals = np.where(totals > 0, totals, 1.0)
+    control = np.column_stack([
+        np.bincount(group, weights=bent[:, 0] * volume) / safe_totals,
+        np.bincount(group, weights=bent[:, 1] * volume) / safe_totals,
+    ])[group]
+    # Zero-volume bundles fall back to each flow's own control point
+    control = np.where((totals > 0)[group, None], control, bent)
+
+    # Quadratic Bezier curves for all flows at once
+    t = np.linspace(0.0, 1.0, samples)[None, :, None]
+    curves = ((1 - t) ** 2 * start[:, None, :] + 2 * (1 - t) * t * control[:, None, :]
+              + t ** 2 * end[:, None, :])
+
+    flows = flows.assign(start_x=start[:, 0], start_y=start[:, 1], end_x=end[:, 0], end_y=end[:, 1],
+                         control_x=control[:, 0], control_y=control[:, 1], bundle=group)
+    return BundledFlows(flows, curves)
+
+
+def _widths(volume, min_width, max_width):
+    import numpy as np
+
+    if len(volume) == 0 or volume.max() == volume.min():
+        return np.full(len(volume), (min_width + max_width) / 2)
+    return min_width + (max_width - min_width) * (volume - volume.min()) / (volume.max() - volume.min())
+
+
+def draw_flows(ax, bundled, colors=None, default_color='#5e3c99', min_width=0.3, max_width=6.0,
+               alpha=0.6, zorder=4):
+    """Add all bundled flows to ``ax`` as one LineCollection and return it.
+
+    ``colors`` optionally maps origins to colors; line widths scale with
+    volume between ``min_width`` and ``max_width`` points.
+    """
+    from matplotlib.collections import LineCollection
+
+    flows = bundled.flows
+    colors = colors or {}
+    lines = LineCollection(
+        bundled.curves,
+        linewidths=_widths(flows['volume'].to_numpy(dtype=float), min_width, max_width),
+        colors=[colors.get(origin, default_color) for origin in flows['origin']],
+        alpha=alpha,
+        capstyle='round',
+        zorder=zorder
+    )
+    ax.add_collection(lines)
+    return lines
+
+
+def render_flow_map(africa, bundled, output_path=None, focus_countries=(), colors=FOCUS_COLORS,
+                    flow_colors=None, dpi=600, extent=SUBSAHARAN_EXTENT):
+    """Render the highlight map with ``bundled`` flows drawn on top.
+
+    Returns the figure, or ``output_path`` once the map is saved there and
+    its figure closed.
+    """
+    template = HighlightTemplate(africa, extent=extent, dpi=dpi)
+    fig = template.render(focus_countries, colors)
+    draw_flows(template.ax, bundled, flow_colors)
+    if not output_path:
+        return fig
+    try:
+        save_figure(fig, output_path, dpi=dpi, bbox_inches='tight')
+    finally:
+        template.close()
+    return output_path
+
+
+def write_flows_drawio(bundled, countries, transform, output_path='migration_flows.drawio',
+                       image='subsaharan_africa_highlighted.png', colors=None):
+    """Write bundled flows to Draw.io, routing each edge through its control point.
+
+    ``transform`` is the ``render.GeoTransform`` of the saved background image.
+    """
+    from .drawio import country_anchors, write_drawio
+
+    flows = bundled.flows
+    names = list(flows['origin']) + list(flows['destination'])
+    anchors = country_anchors(countries, transform, names)
+    waypoints = [[(transform.x0 + x * transform.sx, transform.y0 - y * transform.sy)]
+                 for x, y in zip(flows['control_x'], flows['control_y'])]
+    return write_drawio(flows[list(FLOW_COLUMNS)], anchors, (transform.width, transform.height),
+                        output_path, image=image, colors=colors, waypoints=waypoints)
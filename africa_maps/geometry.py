@@ -0,0 +1,127 @@
+"""Geometry preprocessing before plotting.
+
+``prepare_for_extent`` clips a countries layer to the map extent and
+simplifies it to what is visible at the output resolution, so matplotlib
+never builds paths for off-screen geometry or sub-pixel detail. Shared
+borders are simplified as a coverage and stay aligned between neighbours.
+Results are memoized per layer and (extent, dpi, figure size).
+"""
+import math
+import weakref
+
+from .regions import SUBSAHARAN_EXTENT
+
+# Per-layer memo: id(layer) -> {key: value}, cleared when the layer is collected
+_memo = {}
+
+
+def degrees_per_pixel(extent, dpi, figsize, geographic=True):
+    """Degrees of longitude per output pixel for a map filling ``figsize`` at ``dpi``.
+
+    Uses geopandas' lon/lat aspect; whichever axis constrains the fit wins.
+    For a projected ``extent`` (``geographic=False``) the result is in map
+    units and the aspect is 1.
+    """
+    min_lon, max_lon, min_lat, max_lat = extent
+    aspect = 1 / math.cos(math.radians((min_lat + max_lat) / 2)) if geographic else 1.0
+    width_px, height_px = figsize[0] * dpi, figsize[1] * dpi
+    return max((max_lon - min_lon) / width_px, (max_lat - min_lat) * aspect / height_px)
+
+
+def is_geographic(layer):
+    """Whether ``layer`` is in lon/lat (layers without a CRS are assumed to be)."""
+    return layer.crs is None or layer.crs.is_geographic
+
+
+def _layer_memo(layer):
+    key = id(layer)
+    if key not in _memo:
+        _memo[key] = {}
+        weakref.finalize(layer, _memo.pop, key, None)
+    return _memo[key]
+
+
+def _geometries(layer):
+    import numpy as np
+
+    return np.asarray(layer.geometry.values, dtype=object)
+
+
+def spatial_index(layer):
+    """STRtree over the layer's geometries, built once per layer."""
+    import shapely
+
+    memo = _layer_memo(layer)
+    if 'strtree' not in memo:
+        memo['strtree'] = shapely.STRtree(_geometries(layer))
+    return memo['strtree']
+
+
+def clip_to_extent(layer, extent, pad=0.0):
+    """Rows of ``layer`` intersecting ``extent``, with geometry clipped to it.
+
+    Candidates come from the STRtree; geometries entirely inside the
+    (padded) box are kept as they are and only the rest are clipped.
+    """
+    import numpy as np
+    import shapely
+
+    min_lon, max_lon, min_lat, max_lat = extent
+    x0, y0, x1, y1 = min_lon - pad, min_lat - pad, max_lon + pad, max_lat + pad
+
+    hits = np.sort(spatial_index(layer).query(shapely.box(x0, y0, x1, y1)))
+    geometries = _geometries(layer)[hits]
+
+    bounds = shapely.bounds(geometries)
+    inside = (bounds[:, 0] >= x0) & (bounds[:, 1] >= y0) & (bounds[:, 2] <= x1) & (bounds[:, 3] <= y1)
+    clipped = geometries.copy()
+    clipped[~inside] = shapely.clip_by_rect(geometries[~inside], x0, y0, x1, y1)
+
+    keep = ~shapely.is_empty(clipped)
+    result = layer.iloc[hits[keep]].copy()
+    result = result.set_geometry(clipped[keep], crs=layer.crs)
+    return result
+
+
+def simplify_coverage(geometries, tolerance):
+    """Simplify polygons so that borders shared by neighbours stay shared.
+
+    Uses GEOS coverage simplification when the input is a valid coverage,
+    and per-geometry topology-preserving simplification otherwise.
+    """
+    import shapely
+
+    if tolerance <= 0 or len(geometries) == 0:
+        return geometries
+    if hasattr(shapely, 'coverage_simplify'):
+        try:
+            if shapely.coverage_is_valid(geometries):
+                return shapely.coverage_simplify(geometries, tolerance)
+        except shapely.errors.GEOSException:
+            pass
+    return shapely.simplify(geometries, tolerance, preserve_topology=True)
+
+
+def prepare_for_extent(layer, extent=SUBSAHARAN_EXTENT, dpi=300, figsize=(10, 12), pixel_tolerance=0.5):
+    """Clip ``layer`` to ``extent`` and simplify it to ``pixel_tolerance`` output pixels.
+
+    ``extent`` is in the layer's coordinates (see ``projection`` for
+    projected maps).
+
+    The result is memoized for the lifetime of ``layer``, so repeated renders
+    of the same view skip the work. Layers must not be modified in place
+    after being prepared.
+    """
+    key = ('prepared', tuple(extent), dpi, tuple(figsize), pixel_tolerance)
+    memo = _layer_memo(layer)
+    if key in memo:
+        return memo[key]
+
+    tolerance = pixel_tolerance * degrees_per_pixel(extent, dpi, figsize, is_geographic(layer))
+    # Pad the clip box so the artificial clip edges fall outside the view
+    clipped = clip_to_extent(layer, extent, pad=10 * tolerance)
+    simplified = simplify_coverage(_geometries(clipped), tolerance)
+    prepared = clipped.set_geometry(simplified, crs=layer.crs)
+
+    memo[key] = prepared
+    return prepared
@@ -0,0 +1,239 @@
+"""Headless rendering for servers and batch jobs.
+
+``enable_headless()`` switches matplotlib to the Agg backend. From then on
+the render functions build plain ``Figure`` objects that pyplot never
+registers, so nothing blocks on a window and figures are freed as soon as
+they are dropped. Any render function accepts a file-like object as
+``output_path``; ``render_to_bytes`` wraps that for in-memory output.
+
+``RenderWorker`` runs the renderer in a separate process that loads the
+countries once and takes jobs from a local queue::
+
+    with RenderWorker() as worker:
+        job = worker.submit('highlight', focus_countries=['KEN', 'SOM'])
+        job_id, png = worker.result()
+"""
+import io
+import queue
+import time
+
+# Whether enable_headless() has been called in this process
+_headless = False
+
+# Render functions a worker job can name
+RENDER_KINDS = ('base', 'highlight', 'academic')
+
+
+class RenderError(RuntimeError):
+    """A render job failed in the worker process."""
+
+
+def enable_headless():
+    """Force the non-interactive Agg backend for the rest of the process."""
+    global _headless
+
+    import matplotlib
+    matplotlib.use('Agg', force=True)
+    _headless = True
+
+
+def is_headless():
+    return _headless
+
+
+def new_figure(figsize, facecolor='white'):
+    """Create a figure and its axes.
+
+    In headless mode the figure bypasses pyplot, so it is never kept alive
+    by pyplot's figure registry; otherwise it is an ordinary pyplot figure.
+    """
+    if not _headless:
+        import matplotlib.pyplot as plt
+
+        return plt.subplots(figsize=figsize, facecolor=facecolor)
+
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    fig = Figure(figsize=figsize, facecolor=facecolor)
+    FigureCanvasAgg(fig)
+    return fig, fig.add_subplot()
+
+
+def close_figure(fig):
+    """Release ``fig``, whether or not pyplot manages it."""
+    import sys
+
+    pyplot = sys.modules.get('matplotlib.pyplot')
+    if pyplot is not None and pyplot.fignum_exists(getattr(fig, 'number', None)):
+        pyplot.close(fig)
+    else:
+        fig.clear()
+
+
+def render_to_bytes(render, *args, format='png', **kwargs):
+    """Call a render function with an in-memory output and return the image bytes.
+
+    ``render`` is e.g. ``render_base_map``; ``args`` and ``kwargs`` are passed
+    through. The figure is closed afterwards.
+    """
+    import matplotlib
+
+    buffer = io.BytesIO()
+    with matplotlib.rc_context({'savefig.format': format}):
+        fig = render(*args, output_path=buffer, **kwargs)
+    close_figure(fig)
+    return buffer.getvalue()
+
+
+class _Renderer:
+    """Worker-side state: the loaded countries and one reusable highlight template."""
+
+    def __init__(self, load_kwargs):
+        from .data import load_countries
+
+        self.africa = load_countries(**load_kwargs)
+        self.template = None
+        self.template_key = None
+
+    def highlight(self, output, focus_countries=None, colors=None, dpi=600, figsize=(10, 12)):
+        from .regions import FOCUS_COUNTRIES
+        from .render import FOCUS_COLORS, HighlightTemplate
+
+        # Recycle the template while jobs share its figure size and dpi
+        if self.template_key != (dpi, tuple(figsize)):
+            if self.template is not None:
+                self.template.close()
+            self.template = HighlightTemplate(self.africa, figsize=figsize, dpi=dpi)
+            self.template_key = (dpi, tuple(figsize))
+        self.template.render(FOCUS_COUNTRIES if focus_countries is None else focus_countries,
+                             colors or FOCUS_COLORS, output, dpi)
+
+    def render(self, kind, output, params):
+        from .render import render_academic_map, render_base_map
+
+        if kind == 'highlight':
+            self.highlight(output, **params)
+            return
+        render = {'base': render_base_map, 'academic': render_academic_map}[kind]
+        close_figure(render(self.africa, output_path=output, **params))
+
+
+def _worker_main(jobs, results, load_kwargs):
+    enable_headless()
+    try:
+        renderer = _Renderer(load_kwargs)
+    except Exception as exc:
+        # No job id: the worker could not start
+        results.send((None, None, f'{type(exc).__name__}: {exc}'))
+        return
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, kind, output_path, params = job
+        try:
+            output = output_path or io.BytesIO()
+            renderer.render(kind, output, params)
+            results.send((job_id, output_path or output.getvalue(), None))
+        except Exception as exc:
+            results.send((job_id, None, f'{type(exc).__name__}: {exc}'))
+
+
+class RenderWorker:
+    """Render process fed through a local queue.
+
+    The worker loads the countries once (``load_kwargs`` go to
+    ``load_countries``) and renders jobs in order. Jobs without an output
+    path come back as PNG bytes, the others as their path. Leaving a
+    ``with`` block waits for the queued jobs; leaving it with an exception
+    stops the worker at once.
+    """
+
+    def __init__(self, **load_kwargs):
+        import multiprocessing
+
+        # A fresh interpreter, so the worker never inherits a GUI backend
+        context = multiprocessing.get_context('spawn')
+        self._jobs = context.Queue()
+        self._results, writer = context.Pipe(duplex=False)
+        self._next_id = 0
+        self.process = context.Process(target=_worker_main, args=(self._jobs, writer, load_kwargs), daemon=True)
+        self.process.start()
+        # Only the worker holds the write end, so its death ends the pipe
+        # instead of leaving a half-sent result waiting forever
+        writer.close()
+
+    def submit(self, kind, output_path=None, **params):
+        """Queue a ``kind`` render (see ``RENDER_KINDS``) and return its job id.
+
+        ``params`` are keyword arguments of the matching render function.
+        """
+        if kind not in RENDER_KINDS:
+            raise ValueError(f"Unknown render kind {kind!r}; expected one of {RENDER_KINDS}")
+        job_id = self._next_id
+        self._next_id += 1
+        self._jobs.put((job_id, kind, output_path, params))
+        return job_id
+
+    def result(self, timeout=None):
+        """Next finished job as ``(job_id, bytes or output path)``.
+
+        Raises ``RenderError`` if that job failed, or if the worker could
+        not start or died before finishing it; ``queue.Empty`` if nothing
+        finished within ``timeout`` seconds.
+        """
+        from multiprocessing.connection import wait
+
+        if not self._results.poll() and not wait([self._results, self.process.sentinel], timeout):
+            raise queue.Empty
+        try:
+            job_id, output, error = self._results.recv()
+        except (EOFError, OSError):
+            # The worker died, possibly halfway through sending a result
+            self.process.join()
+            raise RenderError(f"Render worker exited with code {self.process.exitcode}") from None
+        if job_id is None:
+            raise RenderError(f"Render worker failed to start: {error}")
+        if error:
+            raise RenderError(f"Render job {job_id} failed: {error}")
+        return job_id, output
+
+    def close(self, timeout=None):
+        """Let the worker finish the queued jobs and stop it.
+
+        Results that were not collected are read and discarded while
+        waiting, since the worker cannot exit while one is unread. Returns
+        whether the worker stopped within ``timeout`` seconds.
+        """
+        from multiprocessing.connection import wait
+
+        if self.process.is_alive():
+            self._jobs.put(None)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while self.process.is_alive():
+            remaining = None if deadline is None else deadline - time.monotonic()
+            if remaining is not None and remaining <= 0:
+                return False
+            if self._results in wait([self._results, self.process.sentinel], remaining):
+                try:
+                    self._results.recv()
+                except (EOFError, OSError):
+                    break
+        self.process.join()
+        return True
+
+    def terminate(self):
+        """Stop the worker at once, dropping queued jobs and unread results."""
+        self.process.terminate()
+        self.process.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc_info):
+        # Don't render the rest of the queue for a block that failed
+        if exc_type is not None:
+            self.terminate()
+        else:
+            self.close()
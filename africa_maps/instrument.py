@@ -0,0 +1,231 @@
+"""Opt-in per-stage telemetry.
+
+The load, filter, classify, plot, label, savefig and drawio steps are
+wrapped in ``stage(...)`` blocks. While no sink is registered, ``stage``
+returns a shared do-nothing object, so the cost of a disabled block is one
+function call; counts that are expensive to compute (vertices, output
+size) are only gathered when the block is live::
+
+    with instrumented(JsonLinesSink('telemetry.jsonl'), trace_memory=True):
+        render_highlight_map(load_countries())
+
+Each finished stage is sent to every sink as a dict with ``stage``,
+``seconds`` and any fields the stage set, e.g. ``features``, ``vertices``,
+``output_bytes`` and, with ``trace_memory``, ``tracemalloc_peak_bytes``.
+A sink is any callable taking that dict.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager
+
+_sinks = []
+_trace_memory = False
+_lock = threading.Lock()
+
+# Stages tracking their tracemalloc peak, innermost last
+_traced_stages = []
+
+
+def enabled():
+    return bool(_sinks)
+
+
+def add_sink(sink, trace_memory=None):
+    """Start sending stage events to ``sink``.
+
+    ``trace_memory`` turns tracemalloc peak tracking on or off for all
+    sinks; it slows the traced code down noticeably, so it is off by default.
+    """
+    global _trace_memory
+
+    if trace_memory is not None:
+        _trace_memory = trace_memory
+    _sinks.append(sink)
+
+
+def remove_sink(sink):
+    global _trace_memory
+
+    _sinks.remove(sink)
+    if not _sinks:
+        _trace_memory = False
+
+
+@contextmanager
+def instrumented(*sinks, trace_memory=False):
+    """Send stage events to ``sinks`` for the duration of the block."""
+    for sink in sinks:
+        add_sink(sink, trace_memory)
+    try:
+        yield
+    finally:
+        for sink in sinks:
+            remove_sink(sink)
+
+
+class _NullStage:
+    """Stage used while instrumentation is off."""
+
+    def __bool__(self):
+        return False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def set(self, **fields):
+        pass
+
+
+_NULL_STAGE = _NullStage()
+
+
+class _Stage:
+    def __init__(self, name, fields):
+        self.event = {'stage': name, **fields}
+
+    def __bool__(self):
+        return True
+
+    def set(self, **fields):
+        self.event.update(fields)
+
+    def __enter__(self):
+        self._traced = _trace_memory
+        if self._traced:
+            import tracemalloc
+
+            self._started_tracing = not tracemalloc.is_tracing()
+            if self._started_tracing:
+                tracemalloc.start()
+            elif _traced_stages:
+                # Resetting the peak below wipes the enclosing stage's, so
+                # hand it what it has reached so far
+                outer = _traced_stages[-1]
+                outer._inner_peak = max(outer._inner_peak, tracemalloc.get_traced_memory()[1])
+            tracemalloc.reset_peak()
+            self._inner_peak = 0
+            _traced_stages.append(self)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.event['seconds'] = time.perf_counter() - self._start
+        if self._traced:
+            import tracemalloc
+
+            _traced_stages.remove(self)
+            peak = max(tracemalloc.get_traced_memory()[1], self._inner_peak)
+            self.event['tracemalloc_peak_bytes'] = peak
+            if _traced_stages:
+                outer = _traced_stages[-1]
+                outer._inner_peak = max(outer._inner_peak, peak)
+            if self._started_tracing:
+                tracemalloc.stop()
+        if exc_type is not None:
+            self.event['error'] = exc_type.__name__
+        for sink in list(_sinks):
+            sink(self.event)
+        return False
+
+
+def stage(name, **fields):
+    """Context manager timing the ``name`` stage; falsy while instrumentation is off."""
+    if not _sinks:
+        return _NULL_STAGE
+    return _Stage(name, fields)
+
+
+def layer_counts(gdf):
+    """``features`` and ``vertices`` of a GeoDataFrame, for ``stage.set``."""
+    import shapely
+
+    return {'features': len(gdf), 'vertices': int(shapely.get_num_coordinates(gdf.geometry.values).sum())}
+
+
+def output_size(output):
+    """Bytes written to an output path or seekable file-like object, if known."""
+    if isinstance(output, (str, os.PathLike)):
+        return os.path.getsize(output)
+    try:
+        return output.tell()
+    except (AttributeError, OSError, ValueError):
+        return None
+
+
+class LoggingSink:
+    """Log one line per stage."""
+
+    def __init__(self, logger=None, level=logging.INFO):
+        self.logger = logger or logging.getLogger('africa_maps')
+        self.level = level
+
+    def __call__(self, event):
+        fields = ' '.join(f'{key}={value}' for key, value in event.items() if key not in ('stage', 'seconds'))
+        self.logger.log(self.level, '%s took %.4fs %s', event['stage'], event['seconds'], fields)
+
+
+class JsonLinesSink:
+    """Append each event as a JSON line with a timestamp."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def __call__(self, event):
+        line = json.dumps({'time': time.time(), **event}, default=str)
+        with _lock, open(self.path, 'a') as f:
+            f.write(line + '\n')
+
+
+class PrometheusSink:
+    """Keep per-stage totals in a Prometheus text-format file.
+
+    Meant for the node exporter's textfile collector: the file is rewritten
+    atomically after every event.
+    """
+
+    _COUNTERS = (('seconds', 'stage_seconds_total'), ('output_bytes', 'stage_output_bytes_total'))
+    _GAUGES = (('features', 'stage_features'), ('vertices', 'stage_vertices'),
+               ('tracemalloc_peak_bytes', 'stage_tracemalloc_peak_bytes'))
+
+    def __init__(self, path, prefix='africa_maps'):
+        self.path = path
+        self.prefix = prefix
+        self.counts = {}
+        self.totals = {}
+        self.gauges = {}
+
+    def __call__(self, event):
+        name = event['stage']
+        with _lock:
+            self.counts[name] = self.counts.get(name, 0) + 1
+            for field, _ in self._COUNTERS:
+                if event.get(field) is not None:
+                    self.totals[field, name] = self.totals.get((field, name), 0) + event[field]
+            for field, _ in self._GAUGES:
+                if event.get(field) is not None:
+                    self.gauges[field, name] = event[field]
+            self._write()
+
+    def _write(self):
+        lines = [f'# TYPE {self.prefix}_stage_runs_total counter']
+        lines += [f'{self.prefix}_stage_runs_total{{stage="{name}"}} {count}'
+                  for name, count in sorted(self.counts.items())]
+        for metrics, kind in ((self._COUNTERS, 'counter'), (self._GAUGES, 'gauge')):
+            for field, metric in metrics:
+                values = sorted((name, value) for (f, name), value in
+                                (self.totals if kind == 'counter' else self.gauges).items() if f == field)
+                if not values:
+                    continue
+                lines.append(f'# TYPE {self.prefix}_{metric} {kind}')
+                lines += [f'{self.prefix}_{metric}{{stage="{name}"}} {value}' for name, value in values]
+
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write('\n'.join(lines) + '\n')
+        os.replace(tmp_path, self.path)
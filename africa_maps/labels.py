@@ -0,0 +1,172 @@
+"""Country label placement.
+
+Anchors are computed for the whole layer in one vectorized pass: the centre
+of each country's maximum inscribed circle (a polylabel point, which lies
+inside concave and multipart countries, unlike the centroid), or the
+representative point on older shapely versions. Labels are then placed in
+priority order: each one is shrunk until it fits its country, dropped if
+that would take it below the minimum font size, and dropped if it would
+still overlap a label already placed. A uniform grid keeps the collision
+test local.
+
+Placements are memoized per layer and (extent, figure size, font sizes).
+"""
+import math
+
+from .geometry import _layer_memo, degrees_per_pixel, is_geographic
+from .instrument import stage
+from .regions import SUBSAHARAN_EXTENT
+
+# Rough text metrics in points, relative to the font size
+CHAR_WIDTH = 0.6
+LINE_HEIGHT = 1.2
+
+
+def label_anchors(layer):
+    """Label anchor per row as two float arrays ``(x, y)``."""
+    import numpy as np
+    import shapely
+
+    geometries = np.asarray(layer.geometry.values, dtype=object)
+    if hasattr(shapely, 'maximum_inscribed_circle'):
+        circles = shapely.maximum_inscribed_circle(geometries)
+        points = shapely.get_point(circles, 0)
+    else:
+        points = shapely.point_on_surface(geometries)
+    return shapely.get_x(points), shapely.get_y(points)
+
+
+def country_points(countries, names):
+    """Label anchor ``(lon, lat)`` for each country in ``names``.
+
+    ``names`` are ISO codes or country names; they are resolved through the
+    alias index in one vectorized lookup. Names that match no country are
+    left out of the returned dict.
+    """
+    import pandas as pd
+
+    from .regions import build_alias_index, country_keys
+
+    names = list(dict.fromkeys(names))
+    alias_index = build_alias_index(countries)
+    x, y = label_anchors(countries)
+    points = pd.DataFrame({'x': x, 'y': y}, index=country_keys(countries).to_numpy())
+    points = points[~points.index.duplicated(keep='first')]
+
+    keys = alias_index.reindex(pd.Index([str(name) for name in names]).str.casefold())
+    found = points.reindex(keys.to_numpy())
+    return {name: (px, py) for name, px, py in zip(names, found['x'], found['y'])
+            if pd.notna(px) and pd.notna(py)}
+
+
+class _Grid:
+    """Uniform grid of placed label boxes for local overlap tests."""
+
+    def __init__(self, cell_size):
+        self.cell_size = cell_size
+        self.cells = {}
+
+    def _cells(self, box):
+        x0, y0, x1, y1 = box
+        size = self.cell_size
+        for i in range(math.floor(x0 / size), math.floor(x1 / size) + 1):
+            for j in range(math.floor(y0 / size), math.floor(y1 / size) + 1):
+                yield i, j
+
+    def overlaps(self, box):
+        x0, y0, x1, y1 = box
+        for cell in self._cells(box):
+            for bx0, by0, bx1, by1 in self.cells.get(cell, ()):
+                if x0 < bx1 and bx0 < x1 and y0 < by1 and by0 < y1:
+                    return True
+        return False
+
+    def add(self, box):
+        for cell in self._cells(box):
+            self.cells.setdefault(cell, []).append(box)
+
+
+def place_labels(layer, extent=SUBSAHARAN_EXTENT, figsize=(10, 12), fontsize=8, priority=None,
+                 min_fontsize=5, name_column='NAME', keep_overflowing=False):
+    """Place one label per country and return the placements as a DataFrame.
+
+    ``fontsize`` and ``priority`` are scalars or Series aligned with
+    ``layer``; higher priority labels are placed first, then larger
+    countries. Labels that only fit their country below ``min_fontsize``
+    are dropped, or kept at ``min_fontsize`` with ``keep_overflowing``. The
+    result is indexed like ``layer`` and holds ``x``, ``y``, ``name`` and
+    ``fontsize`` for the labels that were kept.
+    """
+    import pandas as pd
+
+    fontsizes = pd.Series(fontsize, index=layer.index, dtype=float)
+    priorities = pd.Series(0 if priority is None else priority, index=layer.index).astype(float)
+
+    key = ('labels', tuple(extent), tuple(figsize), tuple(fontsizes), tuple(priorities),
+           min_fontsize, name_column, keep_overflowing)
+    memo = _layer_memo(layer)
+    if key in memo:
+        return memo[key]
+
+    with stage('label', features=len(layer)) as st:
+        placements = _place_labels(layer, extent, figsize, fontsizes, priorities, min_fontsize, name_column,
+                                   keep_overflowing)
+        st.set(placed=len(placements))
+    memo[key] = placements
+    return placements
+
+
+def _place_labels(layer, extent, figsize, fontsizes, priorities, min_fontsize, name_column, keep_overflowing):
+    import numpy as np
+    import pandas as pd
+    import shapely
+
+    x, y = label_anchors(layer)
+    names = layer[name_column].astype(str).to_numpy()
+    lengths = layer[name_column].astype(str).str.len().to_numpy()
+    bounds = shapely.bounds(np.asarray(layer.geometry.values, dtype=object))
+    areas = (bounds[:, 2] - bounds[:, 0]) * (bounds[:, 3] - bounds[:, 1])
+
+    # Data units per typographic point along each axis
+    min_lat, max_lat = extent[2], extent[3]
+    geographic = is_geographic(layer)
+    x_per_point = degrees_per_pixel(extent, 72, figsize, geographic)
+    y_per_point = x_per_point * math.cos(math.radians((min_lat + max_lat) / 2)) if geographic else x_per_point
+
+    # Half extents of every label box at its requested size
+    half_width = 0.5 * CHAR_WIDTH * lengths * fontsizes.to_numpy() * x_per_point
+    half_height = 0.5 * LINE_HEIGHT * fontsizes.to_numpy() * y_per_point
+    grid = _Grid(max(2 * half_width.max(initial=0), 2 * half_height.max(initial=0), 1e-9))
+
+    # Largest scale that keeps the label inside its country's bounding box
+    fit = np.minimum((bounds[:, 2] - bounds[:, 0]) / np.maximum(2 * half_width, 1e-12),
+                     (bounds[:, 3] - bounds[:, 1]) / np.maximum(2 * half_height, 1e-12))
+
+    order = np.lexsort((-areas, -priorities.to_numpy()))
+    kept, kept_sizes = [], []
+    for i in order:
+        if not (np.isfinite(x[i]) and np.isfinite(y[i])):
+            continue
+        size = fontsizes.iat[i]
+        scale = min(1.0, fit[i])
+        if size * scale < min_fontsize:
+            # Too small to read once it fits its country
+            if not keep_overflowing:
+                continue
+            scale = min_fontsize / size
+        box = (x[i] - half_width[i] * scale, y[i] - half_height[i] * scale,
+               x[i] + half_width[i] * scale, y[i] + half_height[i] * scale)
+        if grid.overlaps(box):
+            continue
+        grid.add(box)
+        kept.append(i)
+        kept_sizes.append(round(size * scale, 1))
+
+    kept = np.asarray(kept, dtype=int)
+    placements = pd.DataFrame({
+        'x': x[kept],
+        'y': y[kept],
+        'name': names[kept],
+        'fontsize': kept_sizes,
+    }, index=layer.index[kept])
+    return placements
@@ -0,0 +1,148 @@
+"""Projected rendering.
+
+The render functions take a ``crs``; by default maps are drawn in plain
+lon/lat. For a projected map the whole countries layer is reprojected once
+per CRS (all coordinates in one pyproj call through ``shapely.transform``)
+and memoized, and the view is the projected bounding box of the lon/lat
+extent. Clipping and simplification then work in map units as usual::
+
+    render_highlight_map(load_countries(), crs=AFRICA_ALBERS)
+
+Scale bars measure their length on the ellipsoid at the point where they
+are drawn, so they are true to scale in any projection.
+"""
+import functools
+
+from .geometry import _geometries, _layer_memo, prepare_for_extent
+from .regions import SUBSAHARAN_EXTENT
+
+# Africa Albers Equal Area Conic (ESRI:102022)
+AFRICA_ALBERS = '+proj=aea +lat_0=0 +lon_0=25 +lat_1=20 +lat_2=-23 +x_0=0 +y_0=0 +datum=WGS84 +units=m +no_defs'
+
+GEOGRAPHIC_CRS = 'EPSG:4326'
+
+
+@functools.lru_cache(maxsize=None)
+def _crs(crs):
+    from pyproj import CRS
+
+    return CRS.from_user_input(crs)
+
+
+@functools.lru_cache(maxsize=None)
+def _transformer(source, target):
+    from pyproj import Transformer
+
+    return Transformer.from_crs(_crs(source), _crs(target), always_xy=True)
+
+
+def transform_coords(x, y, source, target):
+    """Transform coordinate arrays from ``source`` to ``target`` CRS."""
+    return _transformer(_crs_key(source), _crs_key(target)).transform(x, y)
+
+
+def transform_geometries(geometries, source, target):
+    """Transform an array of geometries with a single pyproj call."""
+    import numpy as np
+    import shapely
+
+    transformer = _transformer(_crs_key(source), _crs_key(target))
+
+    def project(coords):
+        return np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
+
+    return shapely.transform(geometries, project)
+
+
+def _crs_key(crs):
+    # CRS objects are not hashable across pyproj versions; their strings are
+    return crs if isinstance(crs, str) else _crs(crs).to_wkt()
+
+
+def project_layer(layer, crs):
+    """``layer`` reprojected to ``crs``, memoized per layer and CRS."""
+    crs = _crs_key(crs)
+    key = ('projected', crs)
+    memo = _layer_memo(layer)
+    if key in memo:
+        return memo[key]
+
+    source = _crs_key(layer.crs) if layer.crs is not None else GEOGRAPHIC_CRS
+    projected = layer.set_geometry(transform_geometries(_geometries(layer), source, crs), crs=_crs(crs))
+    memo[key] = projected
+    return projected
+
+
+def project_extent(extent, crs, samples=64):
+    """Projected bounding box ``(min x, max x, min y, max y)`` of a lon/lat ``extent``.
+
+    The box edges are densified, since they bend in most projections.
+    """
+    import numpy as np
+
+    min_lon, max_lon, min_lat, max_lat = extent
+    lons = np.linspace(min_lon, max_lon, samples)
+    lats = np.linspace(min_lat, max_lat, samples)
+    x = np.concatenate([lons, lons, np.full(samples, min_lon), np.full(samples, max_lon)])
+    y = np.concatenate([np.full(samples, min_lat), np.full(samples, max_lat), lats, lats])
+    px, py = transform_coords(x, y, GEOGRAPHIC_CRS, crs)
+    return float(px.min()), float(px.max()), float(py.min()), float(py.max())
+
+
+def prepare_view(layer, extent=SUBSAHARAN_EXTENT, dpi=300, figsize=(10, 12), crs=None, pixel_tolerance=0.5):
+    """Geometry to draw and axis limits for a map of the lon/lat ``extent``.
+
+    Returns ``(prepared layer, view extent)``; without ``crs`` this is
+    ``prepare_for_extent`` and ``extent`` itself.
+    """
+    if crs is None:
+        return prepare_for_extent(layer, extent, dpi, figsize, pixel_tolerance), extent
+    view = project_extent(extent, crs)
+    return prepare_for_extent(project_layer(layer, crs), view, dpi, figsize, pixel_tolerance), view
+
+
+def ground_length(x, y, dx, crs=None):
+    """Metres on the ellipsoid along a horizontal line of ``dx`` map units from (x, y)."""
+    import numpy as np
+    from pyproj import Geod
+
+    xs = x + dx * np.linspace(0.0, 1.0, 101)
+    ys = np.full(len(xs), float(y))
+    if crs is not None:
+        xs, ys = transform_coords(xs, ys, crs, GEOGRAPHIC_CRS)
+    return Geod(ellps='WGS84').line_length(xs, ys)
+
+
+def scale_bar_length(extent, fraction=0.2):
+    """Round length in km (1, 2 or 5 times a power of ten) of about ``fraction`` of the map width."""
+    import math
+
+    min_lon, max_lon, min_lat, max_lat = extent
+    width_km = (max_lon - min_lon) * 111.32 * math.cos(math.radians((min_lat + max_lat) / 2))
+    target = max(width_km * fraction, 1e-3)
+    power = 10 ** math.floor(math.log10(target))
+    return max(step * power for step in (1, 2, 5) if step * power <= target)
+
+
+def draw_scale_bar(ax, lon, lat, length_km=1000, crs=None, linewidth=1.0, label=None, **text_kwargs):
+    """Draw a horizontal scale bar of ``length_km`` starting at (``lon``, ``lat``).
+
+    The bar's map length is solved for the true ground distance at that
+    point. ``text_kwargs`` style the label below the bar.
+    """
+    x, y = lon, lat
+    if crs is not None:
+        x, y = (float(v) for v in transform_coords(lon, lat, GEOGRAPHIC_CRS, crs))
+
+    # Start from a 1 km guess in map units and rescale; the scale barely
+    # changes along the bar, so two rounds are plenty
+    dx = 1000.0 if crs is not None else 0.01
+    for _ in range(2):
+        dx *= length_km * 1000 / ground_length(x, y, dx, crs)
+
+    # The bar may sit beside the map, outside the axes limits
+    bar, = ax.plot([x, x + dx], [y, y], 'k-', linewidth=linewidth, clip_on=False)
+    text = ax.annotate(label or f'{length_km:g} km', (x + dx / 2, y), xytext=(0, -4),
+                       textcoords='offset points', ha='center', va='top', annotation_clip=False,
+                       **text_kwargs)
+    return bar, text
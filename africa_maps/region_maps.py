@@ -0,0 +1,114 @@
+"""The base and highlight maps for every region in the registry, in parallel.
+
+The world layer is loaded once and each region's members are selected and
+clipped to its extent in the parent process. Workers are forked after
+that, so they inherit the pre-clipped subsets copy-on-write and only
+receive a region name; nothing is read from disk or pickled per task.
+Where fork is unavailable or unsafe (Windows, macOS) each subset is
+pickled to its worker instead::
+
+    render_regions(regions=['eastern_africa', 'western_europe'], output_dir='maps', processes=4)
+"""
+import multiprocessing
+import os
+import sys
+
+from .instrument import stage
+from .regions import FOCUS_COUNTRIES, REGIONS, get_region, select_region
+from .render import FOCUS_COLORS
+
+KINDS = ('base', 'highlight')
+
+# Pre-clipped layer per region name, set before the workers are forked
+_subsets = {}
+
+
+def region_subset(world, region, pad=1.0):
+    """Members of ``region`` in ``world`` clipped to its extent plus ``pad`` degrees.
+
+    Derived territories are split off as in ``load_countries``.
+    """
+    from .geometry import clip_to_extent
+    from .territories import split_territories
+
+    region = get_region(region)
+    return clip_to_extent(split_territories(select_region(world, region)), region.extent, pad)
+
+
+def region_output_path(output_dir, name, kind):
+    return os.path.join(output_dir, f'{name}_{kind}.png')
+
+
+def _render_region(name, kinds, output_dir, dpi, focus_countries, colors, subset=None):
+    from .headless import close_figure
+    from .render import render_base_map, render_highlight_map
+
+    if subset is None:
+        subset = _subsets[name]
+    extent = get_region(name).extent
+    paths = []
+    for kind in kinds:
+        path = region_output_path(output_dir, name, kind)
+        with stage('region', region=name, kind=kind):
+            if kind == 'base':
+                fig = render_base_map(subset, path, dpi=dpi, extent=extent)
+            else:
+                fig = render_highlight_map(subset, focus_countries, colors, path, dpi=dpi, extent=extent)
+        close_figure(fig)
+        paths.append(path)
+    return paths
+
+
+def _fork_context():
+    # Fork is the only start method that shares the parent's memory; it is
+    # unavailable on Windows and unsafe with macOS system frameworks
+    if sys.platform == 'darwin' or 'fork' not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context('fork')
+
+
+def render_regions(world=None, regions=None, kinds=KINDS, output_dir='regions', dpi=300, processes=None,
+                   focus_countries=FOCUS_COUNTRIES, colors=FOCUS_COLORS):
+    """Render ``kinds`` (see ``KINDS``) for each of ``regions`` (default: all of ``REGIONS``).
+
+    ``world`` is the full countries layer; by default it is loaded once
+    through the GeoParquet cache. Maps are written to
+    ``<output_dir>/<region>_<kind>.png`` by ``processes`` worker processes
+    (default: one per CPU; 1 renders here). Returns the written paths per
+    region.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    from .data import load_world
+    from .headless import enable_headless
+
+    names = list(regions or REGIONS)
+    unknown = [kind for kind in kinds if kind not in KINDS]
+    if unknown:
+        raise ValueError(f"Unknown map kinds {unknown}, expected some of {KINDS}")
+    if world is None:
+        world = load_world(use_cache=True)
+    if processes is None:
+        processes = os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    with stage('clip', regions=len(names)):
+        subsets = {name: region_subset(world, name) for name in names}
+
+    args = (kinds, output_dir, dpi, focus_countries, colors)
+    if processes <= 1 or len(names) <= 1:
+        enable_headless()
+        return {name: _render_region(name, *args, subset=subsets[name]) for name in names}
+
+    context = _fork_context()
+    if context is not None:
+        _subsets.update(subsets)
+    try:
+        with ProcessPoolExecutor(max_workers=min(processes, len(names)), mp_context=context,
+                                 initializer=enable_headless) as executor:
+            futures = {name: executor.submit(_render_region, name, *args,
+                                             subset=None if context is not None else subsets[name])
+                       for name in names}
+            return {name: future.result() for name, future in futures.items()}
+    finally:
+        _subsets.clear()
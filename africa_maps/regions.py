@@ -0,0 +1,235 @@
+"""Country selection for the Sub-Saharan and other regional maps.
+
+Only pandas-level operations on an already loaded layer happen here, so
+nothing in this module pulls in matplotlib.
+"""
+import logging
+from collections import namedtuple
+
+from .instrument import stage
+
+logger = logging.getLogger(__name__)
+
+# Manual selection of African countries by ISO code, used when the dataset
+# has no continent column
+AFRICAN_ISO_CODES = ['DZA', 'AGO', 'BEN', 'BWA', 'BFA', 'BDI', 'CMR', 'CPV', 'CAF', 'TCD', 'COM',
+                     'COG', 'COD', 'DJI', 'EGY', 'GNQ', 'ERI', 'ETH', 'GAB', 'GMB', 'GHA', 'GIN',
+                     'GNB', 'CIV', 'KEN', 'LSO', 'LBR', 'LBY', 'MDG', 'MWI', 'MLI', 'MRT', 'MUS',
+                     'MAR', 'MOZ', 'NAM', 'NER', 'NGA', 'RWA', 'STP', 'SEN', 'SYC', 'SLE', 'SOM',
+                     'ZAF', 'SSD', 'SDN', 'SWZ', 'TZA', 'TGO', 'TUN', 'UGA', 'ZMB', 'ZWE']
+
+# North African countries removed to get Sub-Saharan Africa
+NORTH_AFRICAN_ISO = ['DZA', 'EGY', 'LBY', 'MAR', 'TUN']
+NORTH_AFRICAN_NAMES = ['Algeria', 'Egypt', 'Libya', 'Morocco', 'Tunisia']
+
+# Map extent for Sub-Saharan Africa: (min lon, max lon, min lat, max lat)
+SUBSAHARAN_EXTENT = (-18, 52, -35, 15)
+
+# Countries highlighted on the academic map, with the name variants used by
+# different datasets ('Dem. Rep. Congo' vs 'Democratic Republic of the Congo')
+HIGHLIGHTED_COUNTRY_VARIANTS = {
+    'Democratic Republic of the Congo': ['Democratic Republic of the Congo', 'Dem. Rep. Congo', 'Congo, Dem. Rep.', 'DRC', 'Congo, the Democratic Republic of the', 'Congo (Democratic Republic of the)'],
+    'Kenya': ['Kenya', 'Republic of Kenya'],
+    'South Africa': ['South Africa', 'Republic of South Africa', 'S. Africa'],
+    'Somalia': ['Somalia', 'Federal Republic of Somalia']
+}
+
+# Backup lookup by ISO code if names don't match
+HIGHLIGHTED_ISO_CODES = {
+    'ZAF': 'South Africa',
+    'KEN': 'Kenya',
+    'COD': 'Democratic Republic of the Congo',
+    'SOM': 'Somalia'
+}
+
+# A map region: countries whose value in the first of ``columns`` present
+# in the dataset is one of ``values`` (or, without such a column, whose
+# ISO_A3 is in ``iso_codes``), minus the ISO codes in ``exclude`` (or the
+# names in ``exclude_names``), drawn within ``extent``
+Region = namedtuple('Region', ['title', 'columns', 'values', 'extent', 'iso_codes', 'exclude', 'exclude_names'],
+                    defaults=((), (), ()))
+
+_CONTINENT_COLUMNS = ('CONTINENT', 'continent')
+_SUBREGION_COLUMNS = ('SUBREGION', 'subregion')
+
+
+def _continent(title, extent):
+    return Region(title, _CONTINENT_COLUMNS, (title,), extent)
+
+
+def _subregion(title, extent):
+    return Region(title, _SUBREGION_COLUMNS, (title,), extent)
+
+
+# Every region with a map: continents and UN subregions as Natural Earth
+# names them (the UN's South America is the continent). Extents frame the main landmass; far-flung overseas parts (and
+# Russia east of the Urals on the European maps) are cut off.
+REGIONS = {
+    'subsaharan_africa': Region('Sub-Saharan Africa', _CONTINENT_COLUMNS + ('REGION_UN',), ('Africa',),
+                                SUBSAHARAN_EXTENT, AFRICAN_ISO_CODES, NORTH_AFRICAN_ISO, NORTH_AFRICAN_NAMES),
+
+    'africa': _continent('Africa', (-20, 55, -36, 38)),
+    'asia': _continent('Asia', (25, 150, -12, 56)),
+    'europe': _continent('Europe', (-25, 60, 34, 72)),
+    'north_america': _continent('North America', (-170, -10, 5, 84)),
+    'south_america': _continent('South America', (-82, -34, -56, 13)),
+    'oceania': _continent('Oceania', (110, 180, -48, 0)),
+
+    'eastern_africa': _subregion('Eastern Africa', (21, 52, -27, 19)),
+    'middle_africa': _subregion('Middle Africa', (8, 32, -19, 24)),
+    'northern_africa': _subregion('Northern Africa', (-18, 38, 8, 38)),
+    'southern_africa': _subregion('Southern Africa', (11, 33, -35, -16)),
+    'western_africa': _subregion('Western Africa', (-18, 17, 3, 28)),
+    'central_asia': _subregion('Central Asia', (46, 88, 35, 56)),
+    'eastern_asia': _subregion('Eastern Asia', (73, 146, 18, 54)),
+    'south_eastern_asia': _subregion('South-Eastern Asia', (92, 142, -11, 29)),
+    'southern_asia': _subregion('Southern Asia', (43, 98, 5, 40)),
+    'western_asia': _subregion('Western Asia', (25, 61, 12, 44)),
+    'eastern_europe': _subregion('Eastern Europe', (12, 60, 41, 70)),
+    'northern_europe': _subregion('Northern Europe', (-25, 32, 49, 72)),
+    'southern_europe': _subregion('Southern Europe', (-10, 29, 34, 48)),
+    'western_europe': _subregion('Western Europe', (-6, 18, 41, 56)),
+    'caribbean': _subregion('Caribbean', (-86, -59, 9, 28)),
+    'central_america': _subregion('Central America', (-118, -77, 7, 33)),
+    'northern_america': _subregion('Northern America', (-170, -10, 18, 84)),
+    'australia_and_new_zealand': _subregion('Australia and New Zealand', (112, 179, -48, -9)),
+    'melanesia': _subregion('Melanesia', (140, 180, -23, 0)),
+}
+
+# Focus countries of the migration map
+FOCUS_COUNTRIES = {
+    'COD': 'Democratic Republic of the Congo',
+    'KEN': 'Kenya',
+    'ZAF': 'South Africa',
+    'SOM': 'Somalia',
+    'SOMALILAND': 'Somaliland'
+}
+
+# Columns whose values identify a country, in order of precedence
+_ALIAS_COLUMNS = ['ISO_A3', 'ADM0_A3', 'ISO_A2', 'NAME', 'NAME_LONG', 'ADMIN', 'GEOUNIT',
+                  'SOVEREIGNT', 'BRK_NAME', 'NAME_EN', 'NAME_SORT', 'NAME_ALT', 'FORMAL_EN', 'ABBREV']
+
+
+def select_region(world, region='subsaharan_africa'):
+    """Filter a world countries layer down to the members of ``region``.
+
+    ``region`` is a name from ``REGIONS`` or a ``Region``.
+    """
+    region = get_region(region)
+
+    # Get all countries of the region first
+    for column in region.columns:
+        if column in world.columns:
+            members = world[world[column].isin(region.values)]
+            break
+    else:
+        if region.iso_codes and 'ISO_A3' in world.columns:
+            members = world[world['ISO_A3'].isin(region.iso_codes)]
+        else:
+            logger.warning("No suitable column found to identify the countries of %s. Using all countries instead.",
+                           region.title)
+            members = world
+
+    # Remove excluded countries
+    if 'ISO_A3' in members.columns:
+        members = members[~members['ISO_A3'].isin(region.exclude)]
+    elif region.exclude_names:
+        members = members[~members['NAME'].isin(region.exclude_names)]
+
+    return members.copy()
+
+
+def get_region(region):
+    """The ``Region`` for a registry name, or ``region`` itself."""
+    if isinstance(region, Region):
+        return region
+    try:
+        return REGIONS[region]
+    except KeyError:
+        raise ValueError(f"Unknown region {region!r}, expected one of {sorted(REGIONS)}") from None
+
+
+def country_keys(countries):
+    """Canonical key per country: ISO_A3, or ADM0_A3 where ISO_A3 is unset ('-99')."""
+    keys = countries['ISO_A3'].astype(str)
+    if 'ADM0_A3' in countries.columns:
+        keys = keys.mask(keys == '-99', countries['ADM0_A3'].astype(str))
+    return keys
+
+
+def build_alias_index(countries, extra_aliases=HIGHLIGHTED_COUNTRY_VARIANTS):
+    """Map every known name variant and code of a country to its canonical key.
+
+    Aliases are case-folded. Names and codes come from the dataset's own
+    columns; ``extra_aliases`` adds variants for countries identified by any
+    alias already in the index (e.g. 'DRC' for 'Democratic Republic of the Congo').
+    Returns a pandas Series indexed by alias; build it once per layer and
+    reuse it for every lookup.
+    """
+    import pandas as pd
+
+    keys = country_keys(countries).to_numpy()
+    parts = [pd.Series(keys, index=keys)]
+    for column in _ALIAS_COLUMNS:
+        if column in countries.columns:
+            parts.append(pd.Series(keys, index=countries[column].to_numpy()))
+    index = pd.concat(parts)
+    index = index[index.index.notna()]
+    index.index = index.index.astype(str).str.casefold()
+    index = index[index.index != '-99']
+    index = index[~index.index.duplicated(keep='first')]
+
+    if extra_aliases:
+        targets = index.reindex(pd.Index(list(extra_aliases)).str.casefold())
+        extra = [pd.Series(key, index=pd.Index(variants).str.casefold())
+                 for key, variants in zip(targets.to_numpy(), extra_aliases.values())
+                 if isinstance(key, str)]
+        if extra:
+            index = pd.concat([index, *extra])
+            index = index[~index.index.duplicated(keep='first')]
+    return index
+
+
+def resolve_countries(alias_index, names):
+    """Canonical keys for an iterable of names or codes; unknown entries are dropped."""
+    import pandas as pd
+
+    names = pd.Index([str(name) for name in names])
+    return alias_index.reindex(names.str.casefold()).dropna().unique().tolist()
+
+
+def classify_highlights(countries, name_variants=HIGHLIGHTED_COUNTRY_VARIANTS,
+                        iso_codes=HIGHLIGHTED_ISO_CODES, alias_index=None):
+    """Return a boolean Series marking the highlighted countries.
+
+    Every name variant and ISO code is resolved to a canonical key through
+    the alias index, so classifying the layer is a single ``isin``.
+    """
+    with stage('classify', features=len(countries)) as st:
+        if alias_index is None:
+            alias_index = build_alias_index(countries, name_variants)
+        targets = [variant for variants in name_variants.values() for variant in variants]
+        keys = resolve_countries(alias_index, [*name_variants, *targets, *iso_codes])
+        highlight = country_keys(countries).isin(keys)
+        st.set(highlighted=int(highlight.sum()))
+    return highlight
+
+
+def assign_colors(countries, palette, alias_index=None, default=None):
+    """Color per country from a palette keyed by ISO code or country name.
+
+    Countries missing from the palette get ``default`` (``palette['other']``
+    when not given).
+    """
+    import pandas as pd
+
+    with stage('classify', features=len(countries), palette=len(palette)):
+        if alias_index is None:
+            alias_index = build_alias_index(countries)
+        if default is None:
+            default = palette.get('other')
+
+        entries = [name for name in palette if name != 'other']
+        resolved = alias_index.reindex(pd.Index([str(name) for name in entries]).str.casefold())
+        by_key = {key: palette[name] for name, key in zip(entries, resolved.to_numpy()) if isinstance(key, str)}
+        return country_keys(countries).map(by_key).fillna(default)
@@ -0,0 +1,419 @@
+"""Matplotlib rendering of the Sub-Saharan maps.
+
+matplotlib is imported inside the render functions so that importing this
+module (or the package) stays cheap for callers that never draw anything.
+"""
+from collections import namedtuple
+
+from .geometry import is_geographic
+from .headless import close_figure, is_headless, new_figure
+from .instrument import layer_counts, output_size, stage
+from .labels import label_anchors, place_labels
+from .projection import draw_scale_bar, prepare_view, scale_bar_length
+from .regions import (FOCUS_COUNTRIES, SUBSAHARAN_EXTENT, build_alias_index, classify_highlights,
+                      country_keys, resolve_countries)
+
+# ColorBrewer-style palette for the focus countries (commonly used in academic publications)
+FOCUS_COLORS = {
+    'COD': '#b3cde3',      # DRC - Light blue-gray
+    'SOM': '#8c96c6',      # Somalia - Medium purple-gray
+    'KEN': '#8856a7',      # Kenya - Dark purple
+    'ZAF': '#810f7c',      # South Africa - Deep purple
+    'SOMALILAND': '#9e9ac8', # Somaliland (see territories) - Medium purple (more consistent with scheme)
+    'other': '#f0f0f0'      # Other countries - Very light gray
+}
+
+# Borders of the background countries, the focus countries and the focus
+# labels of the highlight map (shared with the tile pyramid)
+BACKGROUND_STYLE = {'edgecolor': '#777777', 'linewidth': 0.3}
+FOCUS_STYLE = {'edgecolor': '#444444', 'linewidth': 0.5}
+LABEL_STYLE = {'fontsize': 8, 'ha': 'center', 'va': 'center', 'color': '#333333', 'fontweight': 'bold',
+               'fontfamily': 'Arial'}
+
+# Affine lon/lat -> pixel mapping of a saved image:
+# px = x0 + lon * sx, py = y0 - lat * sy, image size width x height pixels
+GeoTransform = namedtuple('GeoTransform', ['x0', 'y0', 'sx', 'sy', 'width', 'height'])
+
+
+def image_transform(fig, dpi, ax=None, bbox_inches='tight', pad_inches=None):
+    """Lon/lat to pixel transform of ``fig`` as saved with ``savefig(dpi=dpi, bbox_inches=...)``.
+
+    Call it right after saving, before the figure is changed again.
+    """
+    import matplotlib
+
+    ax = ax or fig.axes[0]
+    ax.apply_aspect()
+    if bbox_inches == 'tight':
+        if pad_inches is None:
+            pad_inches = matplotlib.rcParams['savefig.pad_inches']
+        bbox = fig.get_tightbbox(fig.canvas.get_renderer()).padded(pad_inches)
+    else:
+        bbox = fig.bbox_inches
+
+    # The canvas truncates the saved size to whole pixels and flips y
+    # against that truncated height
+    width, height = int(bbox.width * dpi), int(bbox.height * dpi)
+
+    # Data coordinates -> figure inches
+    to_inches = ax.transData + fig.dpi_scale_trans.inverted()
+    (ox, oy), (ux, uy) = to_inches.transform([(0, 0), (1, 1)])
+    return GeoTransform(
+        x0=(ox - bbox.x0) * dpi,
+        y0=height - (oy - bbox.y0) * dpi,
+        sx=(ux - ox) * dpi,
+        sy=(uy - oy) * dpi,
+        width=width,
+        height=height,
+    )
+
+
+def _set_extent(ax, extent=SUBSAHARAN_EXTENT):
+    min_lon, max_lon, min_lat, max_lat = extent
+    ax.set_xlim(min_lon, max_lon)
+    ax.set_ylim(min_lat, max_lat)
+
+
+def render_base_map(africa, output_path='subsaharan_africa_base.png', dpi=300, figsize=(10, 12),
+                    extent=SUBSAHARAN_EXTENT, crs=None):
+    """Render the uniform base map used as the Draw.io background.
+
+    ``crs`` draws the map in that projection (see ``projection``) instead of lon/lat.
+    """
+    # Create the figure with scientific styling
+    fig, ax = new_figure(figsize, facecolor='white')
+    ax.set_facecolor('#f8f8f8')  # Very subtle background color for land/sea contrast
+
+    # Plot all countries with a uniform color (scientific style)
+    with stage('plot', map='base') as st:
+        visible, view = prepare_view(africa, extent, dpi, figsize, crs)
+        visible.plot(
+            ax=ax,
+            color='#f0f0f0',      # Very light gray for all countries
+            edgecolor='#777777',  # Darker gray borders
+            linewidth=0.3         # Very thin borders for scientific look
+        )
+        if st:
+            st.set(**layer_counts(visible))
+
+    # Remove axis and grid
+    ax.set_axis_off()
+    ax.set_aspect(map_aspect(africa if crs is None else visible))
+    _set_extent(ax, view)
+
+    if output_path:
+        save_figure(fig, output_path, dpi=dpi, bbox_inches='tight', transparent=True)
+    return fig
+
+
+def save_figure(fig, output_path, dpi, **kwargs):
+    """``fig.savefig`` as an instrumented stage."""
+    with stage('savefig', dpi=dpi) as st:
+        fig.savefig(output_path, dpi=dpi, **kwargs)
+        if st:
+            st.set(output_bytes=output_size(output_path))
+
+
+def map_aspect(gdf):
+    """Axes aspect geopandas would use for ``gdf``, for axes we draw ourselves."""
+    import math
+
+    if not is_geographic(gdf):
+        return 'equal'
+    min_y, max_y = gdf.total_bounds[[1, 3]]
+    return 1 / math.cos(math.radians((min_y + max_y) / 2))
+
+
+def geometry_paths(geometry):
+    """Convert a (multi)polygon into matplotlib Paths, one per part, holes included."""
+    import numpy as np
+    import shapely
+    from matplotlib.path import Path
+
+    paths = []
+    for polygon in shapely.get_parts(geometry):
+        if polygon.is_empty:
+            continue
+        rings = [polygon.exterior, *polygon.interiors]
+        paths.append(Path.make_compound_path(
+            *[Path(np.asarray(ring.coords)[:, :2], closed=True) for ring in rings]
+        ))
+    return paths
+
+
+class HighlightTemplate:
+    """Highlight map figure whose background is drawn once and reused.
+
+    The background countries are drawn as a single collection when the
+    template is created. Each call to ``render`` only restyles that
+    collection and overlays the focus polygons and labels, which are removed
+    again after saving. With ``crs`` the map is drawn in that projection.
+    """
+
+    def __init__(self, africa, figsize=(10, 12), extent=SUBSAHARAN_EXTENT, dpi=600, crs=None):
+        from matplotlib.collections import PathCollection
+
+        self.africa = africa
+        self.alias_index = build_alias_index(africa)
+
+        # Paths, label anchors and names per country key, computed once from
+        # the geometry clipped and simplified for this view
+        with stage('plot', map='highlight_template') as st:
+            visible, view = prepare_view(africa, extent, dpi, figsize, crs)
+            self._paths = {}
+            self._labels = {}
+            anchor_x, anchor_y = label_anchors(visible)
+            for iso, name, geometry, x, y in zip(country_keys(visible), visible['NAME'], visible.geometry,
+                                                 anchor_x, anchor_y):
+                if iso in self._paths or geometry is None:
+                    continue
+                self._paths[iso] = geometry_paths(geometry)
+                self._labels[iso] = (x, y, name)
+            background_paths = [path for paths in self._paths.values() for path in paths]
+            self._path_keys = [iso for iso, paths in self._paths.items() for _ in paths]
+            if st:
+                st.set(**layer_counts(visible))
+
+        # Create the figure with scientific styling
+        self.fig, self.ax = new_figure(figsize, facecolor='white')
+        self.ax.set_facecolor('#f8f8f8')
+
+        # All countries in one collection with scientific styling
+        self._background = PathCollection(
+            background_paths,
+            facecolor=FOCUS_COLORS['other'],
+            zorder=1,
+            **BACKGROUND_STYLE
+        )
+        self.ax.add_collection(self._background)
+        self.ax.set_aspect(map_aspect(africa if crs is None else visible))
+
+        self.ax.set_axis_off()
+        _set_extent(self.ax, view)
+
+        # Scale bar instead of a legend (common in scientific maps), to the right of the map,
+        # up a bit to avoid South Africa (50E 20S on the Sub-Saharan extent)
+        min_lon, max_lon, min_lat, max_lat = extent
+        draw_scale_bar(self.ax, min_lon + (max_lon - min_lon) * 68 / 70, min_lat + (max_lat - min_lat) * 0.3,
+                       scale_bar_length(extent), crs, linewidth=1.0, fontsize=8, fontfamily='Arial')
+
+    def render(self, focus_countries=FOCUS_COUNTRIES, colors=FOCUS_COLORS, output_path=None, dpi=600):
+        """Overlay ``focus_countries`` in ``colors`` and save to ``output_path``.
+
+        ``focus_countries`` is any iterable of ISO codes or country names (a
+        dict such as ``FOCUS_COUNTRIES`` works too); ``colors`` may be keyed
+        the same way. The overlay stays on the figure when no output path is
+        given, so the caller can keep drawing on it.
+        """
+        with stage('plot', map='highlight') as st:
+            self._background.set_facecolor(colors.get('other', FOCUS_COLORS['other']))
+            artists = self.overlay(focus_countries, colors)
+            if st:
+                st.set(paths=len(artists[0].get_paths()), labels=len(artists) - 1)
+
+        if output_path is None:
+            return self.fig
+
+        # Higher DPI for publication quality
+        save_figure(self.fig, output_path, dpi=dpi, bbox_inches='tight')
+        for artist in artists:
+            artist.remove()
+        return output_path
+
+    def overlay(self, focus_countries, colors, default_color=None, animated=False):
+        """Add the focus polygons and their labels to the axes and return the new artists.
+
+        The overlay collection comes first. Focus countries missing from
+        ``colors`` are filled with ``default_color``, or the background
+        color. ``animated`` artists are left out of full redraws, for
+        blitting.
+        """
+        from matplotlib.collections import PathCollection
+
+        key_colors = {self._key(name): color for name, color in colors.items() if name != 'other'}
+        if default_color is None:
+            default_color = colors.get('other', FOCUS_COLORS['other'])
+        focus_keys = [self._key(name) for name in focus_countries]
+
+        paths, facecolors = [], []
+        for iso in focus_keys:
+            for path in self._paths.get(iso, []):
+                paths.append(path)
+                facecolors.append(key_colors.get(iso, default_color))
+
+        overlay = PathCollection(
+            paths,
+            facecolor=facecolors,
+            zorder=2,
+            animated=animated,
+            **FOCUS_STYLE  # Same border thickness for all focus countries
+        )
+        self.ax.add_collection(overlay)
+
+        # Country labels in bold
+        artists = [overlay]
+        for iso in focus_keys:
+            if iso not in self._labels:
+                continue
+            x, y, name = self._labels[iso]
+            artists.append(self.ax.text(x, y, name, zorder=3, animated=animated, **LABEL_STYLE))
+        return artists
+
+    @property
+    def keys(self):
+        """Keys of the countries drawn on the map, in drawing order."""
+        return list(self._paths)
+
+    def color_countries(self, key_colors, default_color=FOCUS_COLORS['other']):
+        """Fill every background country with its color in ``key_colors`` (keyed by country key)."""
+        self._background.set_facecolor([key_colors.get(iso, default_color) for iso in self._path_keys])
+
+    def anchor_points(self, names):
+        """Label anchor of each country in ``names``, in the map's coordinates.
+
+        Names that match no country on the map are left out.
+        """
+        points = {}
+        for name in names:
+            key = self._key(name)
+            if key in self._labels:
+                points[name] = self._labels[key][:2]
+        return points
+
+    def _key(self, name):
+        if name in self._paths:
+            return name
+        resolved = resolve_countries(self.alias_index, [name])
+        return resolved[0] if resolved else name
+
+    def close(self):
+        close_figure(self.fig)
+
+
+def render_highlight_map(africa, focus_countries=FOCUS_COUNTRIES, colors=FOCUS_COLORS,
+                         output_path='subsaharan_africa_highlighted.png', dpi=600, crs=None,
+                         extent=SUBSAHARAN_EXTENT, figsize=(10, 12)):
+    """Render the map with each focus country in its own color."""
+    template = HighlightTemplate(africa, figsize=figsize, extent=extent, dpi=dpi, crs=crs)
+    template.render(focus_countries, colors)
+    if output_path:
+        save_figure(template.fig, output_path, dpi=dpi, bbox_inches='tight')
+    return template.fig
+
+
+def render_academic_map(africa, highlight=None, output_path='subsaharan_africa_academic_map.png',
+                        dpi=300, legend_label='DRC, Kenya, South Africa, Somalia', show=False, crs=None):
+    """Render the labelled academic map with a binary highlight.
+
+    ``highlight`` is a boolean Series aligned with ``africa``; by default the
+    countries from ``regions.HIGHLIGHTED_COUNTRY_VARIANTS`` are highlighted.
+    ``crs`` draws the map in that projection instead of lon/lat.
+    """
+    import matplotlib.patches as mpatches
+    import matplotlib.patheffects as path_effects
+
+    if highlight is None:
+        highlight = classify_highlights(africa)
+
+    # Only the visible part of each country, at the detail the output can show
+    figsize = (14, 16)
+    full_layer = africa
+    africa, view = prepare_view(africa, SUBSAHARAN_EXTENT, dpi, figsize, crs)
+    aspect = map_aspect(full_layer if crs is None else africa)
+    highlight = highlight.reindex(africa.index, fill_value=False)
+
+    # Main countries in deep blue, others in a soft beige to create better contrast
+    color = highlight.map({True: '#3a86ff', False: '#fffcf2'})
+
+    # Create a stronger border for highlighted countries
+    edge_width = highlight.map({True: 1.5, False: 0.5})
+    edge_color = highlight.map({True: '#053861', False: '#495057'})
+
+    # Set up the figure with a specific background color for a modern look
+    fig, ax = new_figure(figsize, facecolor='#f8f9fa')
+
+    with stage('plot', map='academic') as st:
+        # First plot the non-highlighted countries
+        africa[~highlight].plot(
+            ax=ax,
+            color=color[~highlight],
+            edgecolor=edge_color[~highlight],
+            linewidth=edge_width[~highlight],
+            alpha=0.8
+        )
+
+        # Then plot the highlighted countries on top for emphasis
+        africa[highlight].plot(
+            ax=ax,
+            color=color[highlight],
+            edgecolor=edge_color[highlight],
+            linewidth=edge_width[highlight],
+            alpha=1.0
+        )
+        if st:
+            st.set(**layer_counts(africa))
+
+    # Add a light blue ocean background
+    ax.set_facecolor('#e9f5fa')
+
+    # Add country labels: highlighted countries in larger white bold text with
+    # a shadow effect, regular countries in smaller dark gray text
+    labels = place_labels(africa, view, figsize,
+                          fontsize=highlight.map({True: 10, False: 7}), priority=highlight)
+    shadow = [path_effects.withStroke(linewidth=2, foreground='#33333322')]
+    for idx, x, y, name, fontsize in zip(labels.index, labels['x'], labels['y'],
+                                         labels['name'], labels['fontsize']):
+        highlighted = highlight[idx]
+        ax.text(
+            x, y,
+            name,
+            fontsize=fontsize,
+            color='white' if highlighted else '#343a40',
+            ha='center',
+            va='center',
+            fontweight='bold' if highlighted else 'normal',
+            path_effects=shadow
+        )
+
+    # Create a more elegant legend with custom styling
+    highlighted_patch = mpatches.Patch(color='#3a86ff', label=legend_label)
+    regular_patch = mpatches.Patch(color='#fffcf2', label='Other Sub-Saharan Countries')
+
+    legend = ax.legend(
+        handles=[highlighted_patch, regular_patch],
+        loc='lower right',
+        frameon=True,
+        framealpha=0.9,
+        edgecolor='#dddddd',
+        facecolor='white',
+        title='Country Classification'
+    )
+    legend.get_title().set_fontweight('bold')
+
+    ax.set_axis_off()
+    ax.set_aspect(aspect)
+    _set_extent(ax, view)
+
+    # Add a subtle grid for reference
+    ax.grid(linestyle='--', alpha=0.3, color='gray')
+
+    # Add a scale bar, true to scale where it is drawn
+    draw_scale_bar(ax, 30, -33, 1000, crs, linewidth=2, fontsize=8)
+
+    # Add a border around the map
+    for spine in ax.spines.values():
+        spine.set_visible(True)
+        spine.set_color('#cccccc')
+        spine.set_linewidth(0.5)
+
+    fig.tight_layout()
+
+    # Save before showing - once an interactive window is closed the figure is gone
+    if output_path:
+        save_figure(fig, output_path, dpi=dpi, bbox_inches='tight', facecolor=fig.get_facecolor())
+    # Nothing to show on a headless backend
+    if show and not is_headless():
+        import matplotlib.pyplot as plt
+
+        plt.show()
+    return fig
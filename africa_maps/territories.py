@@ -0,0 +1,157 @@
+"""Disputed and breakaway territories derived from their parent country.
+
+Some datasets have no row for territories such as Somaliland. For those,
+the territory is cut out of its parent country - along a boundary polygon
+(coordinates or a vector file) or as the union of admin-1 units - and added
+as an ordinary row, while the parent keeps the rest. Styling, labels and
+flow anchors then treat it like every other country. ``load_countries``
+applies this before writing its GeoParquet cache, so the split is computed
+once per dataset::
+
+    africa = load_countries()                      # uses DERIVED_TERRITORIES
+    africa = split_territories(africa, admin1=Admin1Layer(load_admin1()))
+
+Datasets that already have a row for a territory (Natural Earth has one for
+Somaliland, ADM0_A3 'SOL') are left as they are.
+"""
+import hashlib
+import json
+import os
+from collections import namedtuple
+
+# A territory cut out of ``parent`` (a country key): ``boundary`` is a
+# lon/lat polygon - a list of coordinates or the path of a vector file - that
+# only needs to follow the dividing line, since it is clipped to the parent;
+# ``admin1_units`` are admin-1 unit names or codes that make up the
+# territory, used instead of the boundary when admin-1 data is given
+Territory = namedtuple('Territory', ['code', 'name', 'parent', 'boundary', 'admin1_units'])
+
+# British Somaliland's former border with Italian Somaliland: 49E from the
+# coast down to 9N, then to the Ethiopian border at 48E 8N. The other sides
+# lie outside Somalia.
+SOMALILAND_BOUNDARY = [(42.0, 12.5), (49.0, 12.5), (49.0, 9.0), (48.0, 8.0), (48.0, 7.0), (42.0, 7.0)]
+
+DERIVED_TERRITORIES = (
+    Territory('SOL', 'Somaliland', 'SOM', SOMALILAND_BOUNDARY,
+              ('Awdal', 'Woqooyi Galbeed', 'Togdheer', 'Sanaag', 'Sool')),
+)
+
+# Columns set on a derived row; all other attributes are copied from the parent
+_CODE_COLUMNS = ('ISO_A3', 'ISO_A2', 'ISO_N3', 'ADM0_A3', 'SOV_A3', 'GU_A3', 'SU_A3', 'BRK_A3')
+_NAME_COLUMNS = ('NAME', 'NAME_LONG', 'ADMIN', 'GEOUNIT', 'SOVEREIGNT', 'BRK_NAME', 'NAME_EN',
+                 'NAME_SORT', 'NAME_ALT', 'FORMAL_EN', 'ABBREV', 'SUBUNIT')
+
+
+def territories_key(territories=DERIVED_TERRITORIES, admin1_path=None):
+    """Hash of the territory definitions, for keying caches of split layers.
+
+    Boundary files and the admin-1 shapefile are included by content.
+    """
+    from .fetch import sha256_file
+
+    def boundary_key(boundary):
+        if isinstance(boundary, (str, os.PathLike)):
+            return {'file': os.path.basename(boundary), 'sha256': sha256_file(boundary)}
+        return [list(point) for point in boundary] if boundary is not None else None
+
+    payload = [[t.code, t.name, t.parent, boundary_key(t.boundary), list(t.admin1_units or ())]
+               for t in territories]
+    if admin1_path is not None:
+        from .data import shapefile_fingerprint
+
+        payload.append(shapefile_fingerprint(admin1_path))
+    return hashlib.sha256(json.dumps(payload).encode()).hexdigest()
+
+
+def _boundary_geometry(boundary):
+    import shapely
+
+    if isinstance(boundary, (str, os.PathLike)):
+        import geopandas as gpd
+
+        layer = gpd.read_file(boundary)
+        if layer.crs is not None and not layer.crs.is_geographic:
+            layer = layer.to_crs('EPSG:4326')
+        return shapely.union_all(layer.geometry.values)
+    return shapely.Polygon(boundary)
+
+
+def territory_geometry(territory, parent_geometry, admin1=None):
+    """Lon/lat geometry of ``territory`` within ``parent_geometry``.
+
+    Uses the territory's admin-1 units when ``admin1`` (an
+    ``admin1.Admin1Layer``) has them, and its boundary otherwise.
+    """
+    import shapely
+
+    shape = None
+    if admin1 is not None and territory.admin1_units:
+        # Unit names are only unique within a region, so look near the parent
+        candidates = admin1.select(bbox=parent_geometry.bounds)
+        units = candidates[admin1.unit_mask(candidates, territory.admin1_units)]
+        if len(units):
+            shape = shapely.union_all(units.geometry.values)
+    if shape is None:
+        if territory.boundary is None:
+            return None
+        shape = _boundary_geometry(territory.boundary)
+    return shapely.intersection(parent_geometry, shape)
+
+
+def split_territories(countries, territories=DERIVED_TERRITORIES, admin1=None):
+    """``countries`` with each missing territory split off its parent as a new row.
+
+    Territories already present (by code or name) or whose parent is not in
+    the layer are skipped. Returns a new GeoDataFrame; ``countries`` is
+    left unchanged.
+    """
+    import pandas as pd
+    import shapely
+
+    from .projection import GEOGRAPHIC_CRS, _crs_key, transform_geometries
+    from .regions import build_alias_index, country_keys
+
+    alias_index = build_alias_index(countries, extra_aliases=None)
+    projected = countries.crs is not None and not countries.crs.is_geographic
+
+    keys = country_keys(countries)
+    geometries = countries.geometry.values.copy()
+    new_rows = []
+    for territory in territories:
+        if any(alias in alias_index.index for alias in (territory.code.casefold(), territory.name.casefold())):
+            continue
+        positions = (keys == territory.parent).to_numpy().nonzero()[0]
+        if not len(positions):
+            continue
+        position = positions[0]
+
+        parent = geometries[position]
+        if projected:
+            parent = transform_geometries(parent, _crs_key(countries.crs), GEOGRAPHIC_CRS)
+        piece = territory_geometry(territory, parent, admin1)
+        if piece is None or piece.is_empty:
+            continue
+        rest = shapely.difference(parent, piece)
+        if projected:
+            piece, rest = transform_geometries([piece, rest], GEOGRAPHIC_CRS, _crs_key(countries.crs))
+        geometries[position] = rest
+
+        row = countries.iloc[[position]].copy()
+        for column in _CODE_COLUMNS:
+            if column in row.columns:
+                row[column] = territory.code if column in ('ADM0_A3', 'GU_A3', 'SU_A3', 'BRK_A3') else '-99'
+        for column in _NAME_COLUMNS:
+            if column in row.columns:
+                row[column] = territory.name
+        row = row.set_geometry([piece], crs=countries.crs)
+        # Keep the index unique, without renumbering the existing rows
+        if pd.api.types.is_integer_dtype(countries.index) and len(countries):
+            row.index = [countries.index.max() + 1 + len(new_rows)]
+        else:
+            row.index = [territory.code]
+        new_rows.append(row)
+
+    result = countries.set_geometry(geometries, crs=countries.crs)
+    if new_rows:
+        result = pd.concat([result, *new_rows])
+    return result
@@ -0,0 +1,311 @@
+"""XYZ (slippy map) tile pyramid of the highlight map.
+
+Tiles are 256 px Web Mercator PNGs written to ``<tile_dir>/<z>/<x>/<y>.png``
+for every tile touching the map extent. Each tile gets a content hash built
+from what it shows: its address, the geometry of the countries it touches
+and their colors. ``manifest.json`` in the tile directory keeps the hashes
+of the last build, and tiles whose hash is unchanged are not rendered
+again, so changing the highlight set only redraws the tiles around the
+countries that changed. Tiles use the highlight map's border and label
+styles; a focus country's label is drawn on every tile it reaches, so
+labels continue across tile edges::
+
+    write_tile_pyramid(load_countries(), 'tiles', focus_countries=['KEN'], processes=4)
+
+Tiles render in a process pool. Each worker draws the countries once per
+zoom level as one collection and only moves the view between tiles.
+"""
+import hashlib
+import json
+import math
+import os
+
+from .regions import FOCUS_COUNTRIES, SUBSAHARAN_EXTENT
+from .render import BACKGROUND_STYLE, FOCUS_COLORS, FOCUS_STYLE
+
+TILE_SIZE = 256
+OCEAN_COLOR = '#f8f8f8'
+
+# Bump when the tile styling changes, so every tile is redrawn once
+_STYLE_VERSION = 2
+_MANIFEST_NAME = 'manifest.json'
+
+# Pixels a label may reach beyond its anchor, for the tile hashes
+_LABEL_REACH = 128
+
+# Half the width of the Web Mercator world in metres
+_MERCATOR_HALF = math.pi * 6378137.0
+_MAX_LAT = 85.0511287798
+
+# Tile renderer of the current worker process
+_worker_renderer = None
+
+
+def tile_range(extent, zoom):
+    """Inclusive x and y tile index ranges covering ``extent`` at ``zoom``."""
+    min_lon, max_lon, min_lat, max_lat = extent
+    n = 2 ** zoom
+
+    def tile_x(lon):
+        return min(n - 1, max(0, int((lon + 180.0) / 360.0 * n)))
+
+    def tile_y(lat):
+        lat = math.radians(max(-_MAX_LAT, min(_MAX_LAT, lat)))
+        return min(n - 1, max(0, int((1 - math.asinh(math.tan(lat)) / math.pi) / 2 * n)))
+
+    return (tile_x(min_lon), tile_x(max_lon)), (tile_y(max_lat), tile_y(min_lat))
+
+
+def tile_bounds(zoom, x, y):
+    """``(min_lon, min_lat, max_lon, max_lat)`` of a tile."""
+    n = 2 ** zoom
+
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+
+    return x / n * 360.0 - 180.0, lat(y + 1), (x + 1) / n * 360.0 - 180.0, lat(y)
+
+
+def _mercator_bounds(zoom, x, y):
+    size = 2 * _MERCATOR_HALF / 2 ** zoom
+    return (-_MERCATOR_HALF + x * size, _MERCATOR_HALF - (y + 1) * size,
+            -_MERCATOR_HALF + (x + 1) * size, _MERCATOR_HALF - y * size)
+
+
+def mercator_xy(lon, lat):
+    """Web Mercator metres of lon/lat arrays, as two arrays ``(x, y)``."""
+    import numpy as np
+
+    lat = np.clip(lat, -_MAX_LAT, _MAX_LAT)
+    return np.radians(lon) * 6378137.0, np.arcsinh(np.tan(np.radians(lat))) * 6378137.0
+
+
+def to_mercator(geometries):
+    """Project lon/lat geometries to Web Mercator metres in one vectorized call."""
+    import numpy as np
+    import shapely
+
+    return shapely.transform(geometries, lambda coords: np.column_stack(mercator_xy(coords[:, 0], coords[:, 1])))
+
+
+def tile_styles(countries, focus_countries=FOCUS_COUNTRIES, colors=FOCUS_COLORS):
+    """Per-country styling of the tiles, as a DataFrame.
+
+    Columns are the face color, edge color and line width, and the label
+    with its Web Mercator anchor: the country name for the first row of
+    each focus country, None otherwise. Borders follow the highlight map's
+    ``FOCUS_STYLE`` and ``BACKGROUND_STYLE``.
+    """
+    import pandas as pd
+
+    from .labels import label_anchors
+    from .regions import assign_colors, build_alias_index, country_keys, resolve_countries
+
+    alias_index = build_alias_index(countries)
+    keys = country_keys(countries)
+    focus = keys.isin(resolve_countries(alias_index, list(focus_countries)))
+    other = colors.get('other', FOCUS_COLORS['other'])
+    label_x, label_y = mercator_xy(*label_anchors(countries))
+    return pd.DataFrame({
+        'facecolor': assign_colors(countries, colors, alias_index, other).where(focus, other),
+        'edgecolor': focus.map({True: FOCUS_STYLE['edgecolor'], False: BACKGROUND_STYLE['edgecolor']}),
+        'linewidth': focus.map({True: FOCUS_STYLE['linewidth'], False: BACKGROUND_STYLE['linewidth']}),
+        'label': countries['NAME'].where(focus & ~keys.duplicated(), None),
+        'label_x': label_x,
+        'label_y': label_y,
+    }, index=countries.index)
+
+
+def tile_hashes(countries, styles, tiles, tile_size=TILE_SIZE):
+    """Content hash per ``(z, x, y)`` tile in ``tiles``.
+
+    A tile's hash covers its address and size, the style version, the
+    geometry and style of every country it touches and every label whose
+    anchor is within ``_LABEL_REACH`` pixels of it.
+    """
+    import numpy as np
+    import shapely
+
+    from .geometry import spatial_index
+
+    geometries = np.asarray(countries.geometry.values, dtype=object)
+    geometry_hashes = [hashlib.sha1(wkb).hexdigest() for wkb in shapely.to_wkb(geometries)]
+    row_hashes = [f'{g}:{f}:{e}:{w}' for g, f, e, w in zip(
+        geometry_hashes, styles['facecolor'], styles['edgecolor'], styles['linewidth'])]
+
+    labels = styles[styles['label'].notna()]
+    label_hashes = [f'{n}:{x!r}:{y!r}' for n, x, y in zip(labels['label'], labels['label_x'], labels['label_y'])]
+    label_x, label_y = labels['label_x'].to_numpy(), labels['label_y'].to_numpy()
+
+    tree = spatial_index(countries)
+    hashes = {}
+    for z, x, y in tiles:
+        hits = np.sort(tree.query(shapely.box(*tile_bounds(z, x, y)), predicate='intersects'))
+        digest = hashlib.sha256(f'{_STYLE_VERSION}:{tile_size}:{OCEAN_COLOR}:{z}/{x}/{y}'.encode())
+        for i in hits:
+            digest.update(row_hashes[i].encode())
+        reach = _LABEL_REACH * 2 * _MERCATOR_HALF / (tile_size * 2 ** z)
+        min_x, min_y, max_x, max_y = _mercator_bounds(z, x, y)
+        near = ((label_x > min_x - reach) & (label_x < max_x + reach)
+                & (label_y > min_y - reach) & (label_y < max_y + reach))
+        for i in np.flatnonzero(near):
+            digest.update(label_hashes[i].encode())
+        hashes[(z, x, y)] = digest.hexdigest()
+    return hashes
+
+
+class TileRenderer:
+    """Figure of one tile's size that draws a styled countries layer per zoom level.
+
+    The focus labels are drawn unclipped on every tile, so a label near a
+    tile edge is completed on the neighbouring tile.
+    """
+
+    def __init__(self, countries, styles, extent=SUBSAHARAN_EXTENT, tile_size=TILE_SIZE):
+        from .headless import new_figure
+
+        self.countries = countries
+        self.styles = styles
+        self.extent = extent
+        self.tile_size = tile_size
+        self.zoom = None
+        self._collection = None
+        self._labels = []
+
+        self.fig, _ = new_figure((tile_size / 100, tile_size / 100))
+        self.fig.clear()
+        self.ax = self.fig.add_axes([0, 0, 1, 1])
+        self.ax.set_axis_off()
+        self.fig.patch.set_facecolor(OCEAN_COLOR)
+
+    def _draw_zoom(self, zoom):
+        import numpy as np
+        from matplotlib.collections import PathCollection
+
+        from .geometry import clip_to_extent, simplify_coverage
+        from .render import LABEL_STYLE, geometry_paths
+
+        # Half a pixel of detail at this zoom; clip to the tiles' outer edges
+        tolerance = 0.5 * 360.0 / (self.tile_size * 2 ** zoom)
+        (x0, x1), (y0, y1) = tile_range(self.extent, zoom)
+        west, south, _, _ = tile_bounds(zoom, x0, y1)
+        _, _, east, north = tile_bounds(zoom, x1, y0)
+        clipped = clip_to_extent(self.countries, (west, east, south, north), pad=10 * tolerance)
+        geometries = to_mercator(simplify_coverage(np.asarray(clipped.geometry.values, dtype=object),
+                                                   tolerance))
+        styles = self.styles.loc[clipped.index]
+
+        paths, facecolors, edgecolors, linewidths = [], [], [], []
+        for geometry, face, edge, width in zip(geometries, styles['facecolor'], styles['edgecolor'],
+                                               styles['linewidth']):
+            for path in geometry_paths(geometry):
+                paths.append(path)
+                facecolors.append(face)
+                edgecolors.append(edge)
+                linewidths.append(width)
+
+        if self._collection is not None:
+            self._collection.remove()
+        self._collection = PathCollection(paths, facecolors=facecolors, edgecolors=edgecolors,
+                                          linewidths=linewidths)
+        self.ax.add_collection(self._collection)
+
+        if not self._labels:
+            labels = self.styles[self.styles['label'].notna()]
+            self._labels = [self.ax.text(x, y, name, zorder=3, **LABEL_STYLE)
+                            for name, x, y in zip(labels['label'], labels['label_x'], labels['label_y'])]
+        self.zoom = zoom
+
+    def render(self, zoom, x, y, output):
+        """Render tile ``zoom/x/y`` as PNG to a path or file-like ``output``."""
+        if zoom != self.zoom:
+            self._draw_zoom(zoom)
+        min_x, min_y, max_x, max_y = _mercator_bounds(zoom, x, y)
+        self.ax.set_xlim(min_x, max_x)
+        self.ax.set_ylim(min_y, max_y)
+        self.fig.savefig(output, dpi=100, format='png', facecolor=OCEAN_COLOR)
+
+    def close(self):
+        from .headless import close_figure
+
+        close_figure(self.fig)
+
+
+def _write_tile(renderer, tile_dir, tile):
+    z, x, y = tile
+    path = os.path.join(tile_dir, str(z), str(x), f'{y}.png')
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        renderer.render(z, x, y, f)
+    os.replace(tmp_path, path)
+    return path
+
+
+def _init_worker(countries, styles, extent, tile_size):
+    global _worker_renderer
+
+    from .headless import enable_headless
+
+    enable_headless()
+    _worker_renderer = TileRenderer(countries, styles, extent, tile_size)
+
+
+def _render_in_worker(tile_dir, tiles):
+    return [_write_tile(_worker_renderer, tile_dir, tile) for tile in tiles]
+
+
+def _read_manifest(tile_dir):
+    try:
+        with open(os.path.join(tile_dir, _MANIFEST_NAME)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_tile_pyramid(countries, tile_dir='tiles', focus_countries=FOCUS_COUNTRIES, colors=FOCUS_COLORS,
+                       min_zoom=2, max_zoom=6, extent=SUBSAHARAN_EXTENT, processes=None,
+                       tile_size=TILE_SIZE, force=False):
+    """Render the tiles of zooms ``min_zoom``..``max_zoom`` covering ``extent``.
+
+    Tiles whose content hash matches the last build (and whose file still
+    exists) are skipped unless ``force`` is set. Returns the paths of the
+    tiles that were rendered.
+    """
+    styles = tile_styles(countries, focus_countries, colors)
+    tiles = [(z, x, y)
+             for z in range(min_zoom, max_zoom + 1)
+             for (x0, x1), (y0, y1) in [tile_range(extent, z)]
+             for x in range(x0, x1 + 1)
+             for y in range(y0, y1 + 1)]
+    hashes = tile_hashes(countries, styles, tiles, tile_size)
+
+    manifest = {} if force else _read_manifest(tile_dir)
+    dirty = [tile for tile in tiles
+             if manifest.get('{}/{}/{}'.format(*tile)) != hashes[tile]
+             or not os.path.exists(os.path.join(tile_dir, str(tile[0]), str(tile[1]), f'{tile[2]}.png'))]
+
+    if not processes or processes <= 1 or len(dirty) <= 1:
+        renderer = TileRenderer(countries, styles, extent, tile_size)
+        try:
+            written = [_write_tile(renderer, tile_dir, tile) for tile in dirty]
+        finally:
+            renderer.close()
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Contiguous chunks keep each worker on few zoom levels
+        chunk = max(1, math.ceil(len(dirty) / (processes * 4)))
+        chunks = [dirty[i:i + chunk] for i in range(0, len(dirty), chunk)]
+        with ProcessPoolExecutor(max_workers=processes, initializer=_init_worker,
+                                 initargs=(countries, styles, extent, tile_size)) as executor:
+            written = [path for paths in executor.map(_render_in_worker, [tile_dir] * len(chunks), chunks)
+                       for path in paths]
+
+    manifest.update({'{}/{}/{}'.format(*tile): hashes[tile] for tile in dirty})
+    os.makedirs(tile_dir, exist_ok=True)
+    manifest_path = os.path.join(tile_dir, _MANIFEST_NAME)
+    with open(f'{manifest_path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(f'{manifest_path}.tmp', manifest_path)
+    return written
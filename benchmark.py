@@ -0,0 +1,286 @@
+"""Benchmark the map pipeline stage by stage.
+
+Runs read, select, cached load, classify, prepare, render, label, savefig and
+Draw.io export on the bundled Natural Earth countries and on synthetic
+enlarged copies of it (more features, denser vertices), and reports wall
+time per stage. Memory is reported as the process's RSS high-water mark
+after each stage, which is cumulative, and as how much each stage raised
+it. Every dataset runs in a fresh process so the figures don't leak
+between them.
+
+    python benchmark.py --output before.json
+    python benchmark.py --output after.json --compare before.json
+
+With ``--compare``, stages that got slower by more than ``--tolerance`` are
+listed and the exit status is 1.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+# (name, copies of every country, max segment length in degrees or None)
+DATASETS = [
+    ('bundled', 1, None),
+    ('x4-dense', 4, 0.1),
+    ('x16-dense', 16, 0.05),
+]
+
+STAGES = ('read', 'select', 'cached_load', 'classify', 'prepare', 'render', 'label', 'savefig', 'drawio')
+
+
+# Columns that identify a country; suffixed on enlarged copies
+_KEY_COLUMNS = ('ISO_A3', 'ADM0_A3', 'NAME')
+
+
+def _peak_rss_mb():
+    import resource
+
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Bytes on macOS, kilobytes elsewhere
+    return peak / (1 << 20) if sys.platform == 'darwin' else peak / 1024
+
+
+def enlarge(world, copies=1, segment_length=None):
+    """``world`` with every feature repeated ``copies`` times and densified.
+
+    Copies are shifted by a few hundredths of a degree, so they stay in
+    their region. Every copy after the first gets its own codes and names
+    (suffixed with the copy number), so it is drawn as a country of its own
+    instead of being skipped as a duplicate key. Region exclusions by ISO
+    code therefore only match the first copy.
+    """
+    import pandas as pd
+    import shapely
+
+    parts = []
+    for n in range(copies):
+        part = world.copy()
+        geometries = part.geometry.values
+        if segment_length:
+            geometries = shapely.segmentize(geometries, segment_length)
+        part = part.set_geometry(shapely.transform(geometries, lambda xy: xy + 0.01 * n), crs=world.crs)
+        if n:
+            for column in _KEY_COLUMNS:
+                if column in part.columns:
+                    values = part[column].astype(str)
+                    # Unset codes stay unset, so the key falls back to ADM0_A3
+                    part[column] = values.mask(values != '-99', values + f'-{n}')
+        parts.append(part)
+    return pd.concat(parts, ignore_index=True)
+
+
+def _vertex_count(gdf):
+    import shapely
+
+    return int(shapely.get_num_coordinates(gdf.geometry.values).sum())
+
+
+def run_dataset(shapefile_path, dpi=600, repeat=1):
+    """Time every stage on ``shapefile_path``; the best of ``repeat`` runs per stage."""
+    import io
+
+    import geopandas as gpd
+
+    from africa_maps.data import load_countries
+    from africa_maps.drawio import write_drawio
+    from africa_maps.geometry import prepare_for_extent
+    from africa_maps.headless import close_figure, enable_headless
+    from africa_maps.labels import place_labels
+    from africa_maps.regions import (FOCUS_COUNTRIES, SUBSAHARAN_EXTENT, assign_colors, build_alias_index,
+                                     classify_highlights, country_keys, select_region)
+    from africa_maps.render import FOCUS_COLORS, HighlightTemplate
+
+    enable_headless()
+    figsize = (10, 12)
+    timings = {stage: [] for stage in STAGES}
+    rss = {}
+
+    def timed(stage, func, *args, **kwargs):
+        high_water = _peak_rss_mb()
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        timings[stage].append(time.perf_counter() - start)
+        # ru_maxrss only ever grows, so a stage's own share is how much it raised it
+        growth = max(rss.get(stage, {}).get('rss_growth_mb', 0), _peak_rss_mb() - high_water)
+        rss[stage] = {'rss_high_water_mb': round(_peak_rss_mb(), 1), 'rss_growth_mb': round(growth, 1)}
+        return result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for _ in range(repeat):
+            world = timed('read', gpd.read_file, shapefile_path)
+            africa = timed('select', select_region, world)
+
+            load_countries(shapefile_path, cache_dir=tmp)
+            africa = timed('cached_load', load_countries, shapefile_path, cache_dir=tmp)
+
+            def classify():
+                alias_index = build_alias_index(africa)
+                return (classify_highlights(africa, alias_index=alias_index),
+                        assign_colors(africa, FOCUS_COLORS, alias_index))
+            timed('classify', classify)
+
+            timed('prepare', prepare_for_extent, africa, SUBSAHARAN_EXTENT, dpi, figsize)
+
+            def render():
+                template = HighlightTemplate(africa, figsize=figsize, dpi=dpi)
+                template.render(FOCUS_COUNTRIES, FOCUS_COLORS)
+                return template
+            template = timed('render', render)
+
+            timed('label', place_labels, prepare_for_extent(africa, SUBSAHARAN_EXTENT, dpi, figsize),
+                  SUBSAHARAN_EXTENT, figsize)
+
+            buffer = io.BytesIO()
+            timed('savefig', template.fig.savefig, buffer, format='png', dpi=dpi, bbox_inches='tight')
+            close_figure(template.fig)
+
+            # Every ordered pair of countries, the worst case for the diagram
+            keys = list(dict.fromkeys(country_keys(africa)))
+            flows = [(o, d, i + j) for i, o in enumerate(keys) for j, d in enumerate(keys) if o != d]
+            anchors = {key: (i, i) for i, key in enumerate(keys)}
+            timed('drawio', write_drawio, flows, anchors, (1000, 1000), os.path.join(tmp, 'flows.drawio'))
+
+    return {
+        'features': int(len(world)),
+        'vertices': _vertex_count(world),
+        'subsaharan_features': int(len(africa)),
+        'drawn_features': len(template.keys),
+        'png_bytes': len(buffer.getvalue()),
+        'stages': {stage: {'seconds': round(min(timings[stage]), 4), **rss[stage]} for stage in STAGES},
+        'total_seconds': round(sum(min(timings[stage]) for stage in STAGES), 4),
+        'rss_high_water_mb': round(_peak_rss_mb(), 1),
+    }
+
+
+def _environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        commit = ''
+    versions = {}
+    for module in ('geopandas', 'shapely', 'matplotlib', 'numpy', 'pandas'):
+        try:
+            versions[module] = __import__(module).__version__
+        except ImportError:
+            pass
+    return {'commit': commit or None, 'python': platform.python_version(), 'platform': platform.platform(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'versions': versions}
+
+
+def _run_in_subprocess(shapefile_path, dpi, repeat):
+    command = [sys.executable, os.path.abspath(__file__), '--worker', shapefile_path,
+               '--dpi', str(dpi), '--repeat', str(repeat)]
+    output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+    return json.loads(output.splitlines()[-1])
+
+
+def compare(results, baseline, tolerance):
+    """Stage regressions of ``results`` against ``baseline``, as printable lines."""
+    regressions = []
+    for name, result in results['datasets'].items():
+        old = baseline.get('datasets', {}).get(name)
+        if old is None:
+            continue
+        for stage, timing in result['stages'].items():
+            before = old['stages'].get(stage, {}).get('seconds')
+            # Ignore noise on stages that take next to no time
+            if before is None or max(before, timing['seconds']) < 0.01:
+                continue
+            ratio = timing['seconds'] / before if before else float('inf')
+            if ratio > 1 + tolerance:
+                regressions.append(f"{name}/{stage}: {before:.4f}s -> {timing['seconds']:.4f}s ({ratio:.2f}x)")
+    return regressions
+
+
+def check_scaling(results):
+    """Datasets that drew fewer features than their copies of the bundled one, as printable lines.
+
+    Fewer means copies were dropped on the way (e.g. as duplicate keys), so
+    the timings would not measure the larger dataset.
+    """
+    bundled = results['datasets'].get('bundled')
+    if bundled is None:
+        return []
+    problems = []
+    for name, copies, _ in DATASETS:
+        result = results['datasets'].get(name)
+        if result is None or name == 'bundled':
+            continue
+        expected = copies * bundled['drawn_features']
+        if result['drawn_features'] < expected:
+            problems.append(f"{name} drew {result['drawn_features']} features, expected {expected}")
+    return problems
+
+
+def _print_table(results):
+    for name, result in results['datasets'].items():
+        print(f"\n{name}: {result['features']} features, {result['vertices']} vertices, "
+              f"{result['drawn_features']}/{result['subsaharan_features']} Sub-Saharan features drawn, "
+              f"{result['total_seconds']:.2f}s, RSS high-water mark {result['rss_high_water_mb']:.0f} MB")
+        print(f"  {'stage':<12} {'seconds':>10}  {'high-water':>10}  {'growth':>8}")
+        for stage, timing in result['stages'].items():
+            print(f"  {stage:<12} {timing['seconds']:>9.4f}s  {timing['rss_high_water_mb']:>7.1f} MB  "
+                  f"{timing['rss_growth_mb']:>5.1f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', help='write the results as JSON to this file')
+    parser.add_argument('--compare', help='JSON results of an earlier run to compare against')
+    parser.add_argument('--tolerance', type=float, default=0.2, help='allowed slowdown per stage (0.2 = 20%%)')
+    parser.add_argument('--datasets', nargs='+', default=[name for name, _, _ in DATASETS],
+                        help='datasets to run')
+    parser.add_argument('--dpi', type=int, default=600)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--worker', metavar='SHAPEFILE', help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.worker:
+        print(json.dumps(run_dataset(args.worker, args.dpi, args.repeat)))
+        return 0
+
+    from africa_maps.data import SHAPEFILE_PATH, download_countries, load_world
+
+    download_countries(SHAPEFILE_PATH)
+    results = {'environment': _environment(), 'dpi': args.dpi, 'repeat': args.repeat, 'datasets': {}}
+    with tempfile.TemporaryDirectory() as tmp:
+        world = None
+        for name, copies, segment_length in DATASETS:
+            if name not in args.datasets:
+                continue
+            if copies == 1 and segment_length is None:
+                path = SHAPEFILE_PATH
+            else:
+                world = load_world(SHAPEFILE_PATH) if world is None else world
+                path = os.path.join(tmp, f'{name}.shp')
+                enlarge(world, copies, segment_length).to_file(path)
+            print(f"Running {name}...", file=sys.stderr)
+            results['datasets'][name] = _run_in_subprocess(path, args.dpi, args.repeat)
+
+    _print_table(results)
+    for line in check_scaling(results):
+        print(f"Warning: {line}", file=sys.stderr)
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} stage(s) slower than the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+            return 1
+        print("\nNo regressions against the baseline")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,35 @@
+"""Render the base and highlight maps for every continent and UN subregion.
+
+The world layer is loaded once and the regions render in parallel, one
+worker process per CPU by default:
+
+    python region_maps.py --regions eastern_africa western_europe --processes 4
+"""
+import argparse
+import logging
+
+from africa_maps.region_maps import KINDS, render_regions
+from africa_maps.regions import REGIONS
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--regions', nargs='+', choices=sorted(REGIONS), help='regions to render (default: all)')
+    parser.add_argument('--kinds', nargs='+', choices=KINDS, default=list(KINDS))
+    parser.add_argument('--output-dir', default='regions')
+    parser.add_argument('--dpi', type=int, default=300)
+    parser.add_argument('--processes', type=int, help='render processes (default: one per CPU)')
+    args = parser.parse_args(argv)
+
+    # Show the library's progress messages, e.g. downloads
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    written = render_regions(regions=args.regions, kinds=args.kinds, output_dir=args.output_dir, dpi=args.dpi,
+                             processes=args.processes)
+    for paths in written.values():
+        for path in paths:
+            print(f"Saved '{path}'")
+
+
+if __name__ == '__main__':
+    main()